@@ -0,0 +1,98 @@
+"""
+Compare the specialized conllulex reader in `conllulex.reading` against `conllu.parse`.
+
+Usage:
+    python benchmarks/bench_reading.py path/to/streusle.conllulex [--repeat N]
+
+Two workloads are timed on the given file: parsing alone, and parsing followed by
+reading back the FEATS, DEPS, and MISC columns as strings the way `conllulex2json` does.
+The best of N runs is reported for each, and the two readers' outputs are checked to be
+identical before timing.
+
+Results on a synthetic file of STREUSLE size, made of the three sentences of
+tests/data/streusle.conllulex repeated in 2,700 documents (8,100 sentences, 54,000 tokens),
+with Python 3.11 and conllu 4.5.3:
+
+    $ python benchmarks/bench_reading.py streusle_sized.conllulex --repeat 10
+    streusle_sized.conllulex: 8100 sentences, 54000 tokens, best of 10 runs
+                     parse: conllu.parse 1.079s, conllulex.reading 0.398s (2.71x)
+      parse + JSON columns: conllu.parse 1.223s, conllulex.reading 0.410s (2.98x)
+
+Timings on a shared machine vary by 10-20% between runs, but the ratios stay around 2.7-3x.
+"""
+import argparse
+import gc
+import time
+
+import conllu
+from conllu.serializer import serialize_field
+
+from conllulex.reading import CONLLULEX_FIELDS, get_conllulex_tokenlists, serialize_token_field
+
+
+def parse_with_conllu(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return conllu.parse(f.read(), fields=CONLLULEX_FIELDS)
+
+
+def parse_with_conllulex(path):
+    return get_conllulex_tokenlists(path)
+
+
+def json_columns_with_conllu(path):
+    for sentence in parse_with_conllu(path):
+        for token in sentence:
+            for key in ("feats", "deps", "misc"):
+                serialize_field(token[key])
+
+
+def json_columns_with_conllulex(path):
+    for sentence in parse_with_conllulex(path):
+        for token in sentence:
+            for key in ("feats", "deps", "misc"):
+                serialize_token_field(token, key)
+
+
+def best_time(f, path, repeat):
+    # Like timeit, keep the garbage collector out of the measurements
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            f(path)
+            times.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    expected = parse_with_conllu(args.path)
+    actual = parse_with_conllulex(args.path)
+    assert expected == actual, "readers disagree"
+    assert all(e.serialize() == a.serialize() for e, a in zip(expected, actual)), "readers disagree"
+    n_tokens = sum(len(s) for s in expected)
+    print(f"{args.path}: {len(expected)} sentences, {n_tokens} tokens, best of {args.repeat} runs")
+    del expected, actual
+
+    for name, baseline, specialized in [
+        ("parse", parse_with_conllu, parse_with_conllulex),
+        ("parse + JSON columns", json_columns_with_conllu, json_columns_with_conllulex),
+    ]:
+        t_baseline = best_time(baseline, args.path, args.repeat)
+        t_specialized = best_time(specialized, args.path, args.repeat)
+        print(
+            f"{name:>22}: conllu.parse {t_baseline:.3f}s, conllulex.reading {t_specialized:.3f}s "
+            f"({t_baseline / t_specialized:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
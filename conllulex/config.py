@@ -260,12 +260,11 @@ CORPUS_CFG = {
     "pastrie": {
         "language": "en",
         "enrichment_subtasks": [
-            "dedupe_question_marks",
+            ["normalize_supersenses", "dedupe_question_marks", "prefix_prepositional"],
             "make_compound_prts_smwes",
             "add_mwe_metadatum",
             "add_lexlemma",
             "add_wlemma",
-            "prefix_prepositional_supersenses",
             "add_lexcat",
             "add_lextag",
             "renumber_mwes",
@@ -294,7 +293,7 @@ CORPUS_CFG = {
     "prince_zh": {
         "language": "zh",
         "enrichment_subtasks": [
-            "capitalize_supersenses",
+            ["normalize_supersenses", "capitalize"],
             "assign_sent_id",
             "add_mwe_metadatum",
             "add_lexlemma",
@@ -310,7 +309,7 @@ CORPUS_CFG = {
     "prince_hi": {
         "language": "hi",
         "enrichment_subtasks": [
-            "dedupe_question_marks",
+            ["normalize_supersenses", "dedupe_question_marks"],
             "add_mwe_metadatum",
             "add_lexlemma",
             "add_wlemma",
@@ -329,7 +328,7 @@ CORPUS_CFG = {
             "add_mwe_metadatum",
             "add_lexlemma",
             "add_wlemma",
-            "prefix_prepositional_supersenses",
+            ["normalize_supersenses", "prefix_prepositional"],
             "add_lexcat_la",
             "add_lextag",
         ],
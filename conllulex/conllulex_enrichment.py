@@ -2,17 +2,56 @@
 This is a collection of utilities for taking a sparse conllulex file and populating
 more of its columns and metadata fields by guessing and/or 
 """
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
 import sys
-from collections import defaultdict
+from collections import Counter, defaultdict, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from functools import lru_cache
+from itertools import islice
 
 import conllu
+from conllu.parser import parse_comment_line, parse_sentences
 from tqdm import tqdm
 
 from conllulex.mwe_render import render
-from conllulex.reading import get_conllulex_tokenlists
+from conllulex.profiling import SubtaskProfile
+from conllulex.reading import (
+    is_compressed,
+    iter_conllulex_file,
+    open_file,
+    pack_tokenlist,
+    parse_conllulex_sentence,
+    serialize_conllulex_sentence,
+    unpack_tokenlist,
+)
 from conllulex.supersenses import PSS
 from conllulex.tagging import sent_tags
 
+# Rule 1 of compute_lexcat: lexcats of shorthand supersense annotations
+SHORTHAND_LEXCATS = {
+    "`a": "AUX",
+    "`c": "CCONJ",
+    "`d": "DISC",
+    "`i": "INF",
+    "`j": "ADJ",
+    "`n": "N",
+    "`o": "PRON",
+    "`r": "ADV",
+    "`v": "V",
+}
+# Rule 3a of compute_lexcat: lexcats of adpositional tokens by XPOS
+XPOS_LEXCATS = {
+    "PRP$": "PRON.POSS",
+    "WP$": "PRON.POSS",
+    "POS": "POSS",
+    "TO": "INF.P",
+}
+
 
 def compute_lexcat_latin(t, tid, smweGroupToks, poses, rels):
     smwe = t["smwe"]
@@ -28,28 +67,12 @@ def compute_lexcat_latin(t, tid, smweGroupToks, poses, rels):
         return "_"
 
     # Rule 1
-    lc = {
-        "`a": "AUX",
-        "`c": "CCONJ",
-        "`d": "DISC",
-        "`i": "INF",
-        "`j": "ADJ",
-        "`n": "N",
-        "`o": "PRON",
-        "`r": "ADV",
-        "`v": "V",
-    }
-    if ss in lc:
-        return lc[ss]
+    if ss in SHORTHAND_LEXCATS:
+        return SHORTHAND_LEXCATS[ss]
 
     # Rule 3
     if ss == "`$" or ss == "??" or ss.startswith("p.") or upos == "ADP":
-        lc = {
-            "PRP$": "PRON.POSS",
-            "WP$": "PRON.POSS",
-            "POS": "POSS",
-            "TO": "INF.P",
-        }.get(xpos)
+        lc = XPOS_LEXCATS.get(xpos)
         if lc is not None:
             return lc
         assert ss != "`$"
@@ -179,28 +202,13 @@ def compute_lexcat(tokNum, smwe, smweGroupToks, ss, lexlemma, poses, rels):
         return "_"
 
     # Rule 1
-    lc = {
-        "`a": "AUX",
-        "`c": "CCONJ",
-        "`d": "DISC",
-        "`i": "INF",
-        "`j": "ADJ",
-        "`n": "N",
-        "`o": "PRON",
-        "`r": "ADV",
-        "`v": "V",
-    }.get(ss)
+    lc = SHORTHAND_LEXCATS.get(ss)
     if lc is not None:
         return lc
 
     # Rule 3
     if ss == "`$" or ss == "??" or ss.startswith("p.") or upos == "ADP":
-        lc = {
-            "PRP$": "PRON.POSS",
-            "WP$": "PRON.POSS",
-            "POS": "POSS",
-            "TO": "INF.P",
-        }.get(xpos)
+        lc = XPOS_LEXCATS.get(xpos)
         if lc is not None:
             return lc
         assert ss != "`$"
@@ -258,6 +266,96 @@ def compute_lexcat(tokNum, smwe, smweGroupToks, ss, lexlemma, poses, rels):
     return upos
 
 
+# lexcat decision tables ---------------------------------------------------------------
+# Most tokens' lexcats follow from their UPOS, XPOS, supersense, and position in a strong MWE alone. For
+# those, the rules of compute_lexcat and compute_lexcat_latin are evaluated once per combination of values
+# and kept in a table. Tokens whose lexcat also depends on their lexlemma, feats, or other tokens of their
+# MWE are looked up as `FALLBACK` and go through the functions above.
+FALLBACK = object()
+NOT_IN_MWE, MWE_INITIAL, MWE_NON_INITIAL = 0, 1, 2
+
+
+def _mwe_position(smwe):
+    if smwe == "_":
+        return NOT_IN_MWE
+    return MWE_INITIAL if smwe.endswith(":1") else MWE_NON_INITIAL
+
+
+def _lexcat_rule(upos, xpos, ss, mwe_position):
+    """What compute_lexcat returns for a token with these values, or FALLBACK if that depends on more."""
+    if not isinstance(xpos, str) or not isinstance(ss, str):
+        return FALLBACK
+    if ss == "??" and upos == "ADP" and xpos == "IN":
+        return "P"
+    if mwe_position == MWE_NON_INITIAL:
+        return "_"
+    if ss in SHORTHAND_LEXCATS:
+        return SHORTHAND_LEXCATS[ss]
+    if ss == "`$" or ss == "??" or ss.startswith("p.") or upos == "ADP":
+        if xpos in XPOS_LEXCATS:
+            return XPOS_LEXCATS[xpos]
+        if ss == "`$" or mwe_position == MWE_INITIAL:
+            return FALLBACK
+        return "P"
+    if upos == "AUX":
+        return "AUX"
+    if upos in ["NOUN", "PROPN"]:
+        return "N"
+    if upos == "VERB" or xpos[0:2] == "VB":
+        return "V"
+    if upos == "PART" or mwe_position == MWE_INITIAL:
+        return FALLBACK
+    return upos
+
+
+_LATIN_ADPOSITIONAL_LEXCATS = {
+    "NOUN": "N.P",
+    "PROPN": "N.P",
+    "PRON": "PRON.P",
+    "ADP": "P",
+    "ADJ": "SUBST",
+    "DET": "SUBST",
+}
+
+
+def _lexcat_rule_latin(upos, xpos, ss, mwe_position):
+    """What compute_lexcat_latin returns for a token with these values, or FALLBACK if that depends on more."""
+    if not isinstance(xpos, str) or not isinstance(ss, str):
+        return FALLBACK
+    if mwe_position == MWE_NON_INITIAL:
+        return "_"
+    if ss in SHORTHAND_LEXCATS:
+        return SHORTHAND_LEXCATS[ss]
+    if ss == "`$" or ss == "??" or ss.startswith("p.") or upos == "ADP":
+        if xpos in XPOS_LEXCATS:
+            return XPOS_LEXCATS[xpos]
+        if ss == "`$" or mwe_position == MWE_INITIAL or upos == "VERB":
+            return FALLBACK
+        return _LATIN_ADPOSITIONAL_LEXCATS.get(upos, upos)
+    if upos == "AUX":
+        return "AUX"
+    if upos in ["NOUN", "PROPN"]:
+        return "N"
+    if upos == "VERB" or xpos[0:2] == "VB":
+        return "V"
+    if upos == "PART" or mwe_position == MWE_INITIAL:
+        return FALLBACK
+    return upos
+
+
+_LEXCAT_TABLE = {}
+_LEXCAT_TABLE_LATIN = {}
+
+
+def _table_lexcat(table, rule, t):
+    key = (t["upos"], t["xpos"], t["ss"], _mwe_position(t["smwe"]))
+    try:
+        return table[key]
+    except KeyError:
+        lexcat = table[key] = rule(*key)
+        return lexcat
+
+
 # misc --------------------------------------------------------------------------------
 special_labels = ["`i", "`d", "`c", "`$", "??"]
 
@@ -284,10 +382,61 @@ def get_token(sentence, tid):
         raise Exception(f"Token with ID {tid} not found in {sentence.metadata['sent_id']}")
 
 
+class SentenceIndex:
+    """
+    What subtasks would otherwise find by rescanning a sentence: its tokens by ID (as `get_token`
+    finds them) and the token IDs of its strong and weak MWEs (as `read_mwes` returns them).
+
+    Use `sentence_index` to get the index of a sentence, so that it is built once and shared by all
+    subtasks. MWE groups are recomputed on first use after `set_mwe`; code that changes the smwe or
+    wmwe column of a token by itself must call `invalidate_mwes`.
+    """
+
+    __slots__ = ("sentence", "n_tokens", "_tokens_by_id", "_mwes")
+
+    def __init__(self, sentence):
+        self.sentence = sentence
+        self.n_tokens = len(sentence)
+        self._tokens_by_id = {}
+        for t in sentence:
+            self._tokens_by_id.setdefault(t["id"], t)
+        self._mwes = None
+
+    def token(self, tid):
+        t = self._tokens_by_id.get(tid)
+        if t is None:
+            # e.g. an ID given as a string: fall back to comparing string forms
+            return get_token(self.sentence, tid)
+        return t
+
+    def mwes(self):
+        """Like `read_mwes`. The returned dicts are shared and must not be modified."""
+        if self._mwes is None:
+            self._mwes = read_mwes(self.sentence)
+        return self._mwes
+
+    def set_mwe(self, token, column, value):
+        """Set the smwe or wmwe column of a token of the sentence."""
+        token[column] = value
+        self._mwes = None
+
+    def invalidate_mwes(self):
+        self._mwes = None
+
+
+def sentence_index(sentence):
+    """Return the `SentenceIndex` of a sentence, building it the first time it is needed."""
+    index = getattr(sentence, "_sentence_index", None)
+    if index is None or index.sentence is not sentence or index.n_tokens != len(sentence):
+        index = SentenceIndex(sentence)
+        sentence._sentence_index = index
+    return index
+
+
 # modifications --------------------------------------------------------------------------------
 def add_lextag(sentences):
     for sentence in sentences:
-        smwes, wmwes = read_mwes(sentence)
+        smwes, wmwes = sentence_index(sentence).mwes()
         tags = sent_tags(len(sentence), sentence, list(smwes.values()), list(wmwes.values()))
         for i, (t, tag) in enumerate(zip(sentence, tags)):
             if tag not in ["I_", "i_"]:
@@ -301,22 +450,29 @@ def add_lextag(sentences):
 
 def add_wlemma(sentences):
     for sentence in sentences:
-        _, wmwes = read_mwes(sentence)
+        index = sentence_index(sentence)
+        _, wmwes = index.mwes()
 
         for t in sentence:
             wmwe_tok_ids = [] if ":" not in t["wmwe"] else wmwes[t["wmwe"].split(":")[0]]
             if len(wmwe_tok_ids) > 0 and str(wmwe_tok_ids[0]) == str(t["id"]):
-                t["wlemma"] = " ".join([get_token(sentence, tid)["lemma"] for tid in wmwe_tok_ids])
+                t["wlemma"] = " ".join([index.token(tid)["lemma"] for tid in wmwe_tok_ids])
 
 
 def add_lexcat_la(sentences):
     for sentence in sentences:
-        smwes, _ = read_mwes(sentence)
-        poses = [(t["upos"], t["xpos"]) for t in sentence]
-        deps = [(t["head"], t["deprel"]) for t in sentence]
-        for t in sentence:
-            smwe_tok_ids = "_" if ":" not in t["smwe"] else smwes[t["smwe"].split(":")[0]]
-            t["lexcat"] = compute_lexcat_latin(t, t["id"], smwe_tok_ids, poses, deps)
+        lexcats = [_table_lexcat(_LEXCAT_TABLE_LATIN, _lexcat_rule_latin, t) for t in sentence]
+        if FALLBACK in lexcats:
+            smwes, _ = sentence_index(sentence).mwes()
+            poses = [(t["upos"], t["xpos"]) for t in sentence]
+            deps = [(t["head"], t["deprel"]) for t in sentence]
+            for i, t in enumerate(sentence):
+                if lexcats[i] is FALLBACK:
+                    smwe_tok_ids = "_" if ":" not in t["smwe"] else smwes[t["smwe"].split(":")[0]]
+                    lexcats[i] = compute_lexcat_latin(t, t["id"], smwe_tok_ids, poses, deps)
+
+        for t, lexcat in zip(sentence, lexcats):
+            t["lexcat"] = lexcat
 
             if t["ss"][0] == "`":
                 # If it was for `i, force SCONJ+CC pos tags
@@ -332,20 +488,31 @@ def add_lexcat_la(sentences):
 
 def add_lexcat(sentences):
     for sentence in sentences:
-        smwes, _ = read_mwes(sentence)
-        poses = [(t["upos"], t["xpos"]) for t in sentence]
-        deps = [(t["head"], t["deprel"]) for t in sentence]
+        lexcats = []
         for t in sentence:
             # hindi idiosyncrasy--should be `d not p.`d
-            t["ss"] = t["ss"][2:] if len(t["ss"]) > 2 and t["ss"][:3] == "p.`" else t["ss"]
-            t["ss2"] = t["ss2"][2:] if len(t["ss2"]) > 2 and t["ss2"][:3] == "p.`" else t["ss2"]
+            t["ss"] = _strip_shorthand_prefix(t["ss"])
+            t["ss2"] = _strip_shorthand_prefix(t["ss2"])
 
             # sneakily remove NONSNACS or p.NONSNACS if we encounter it
             # t["ss"] = "_" if t["ss"] in ["NONSNACS", "p.NONSNACS"] else t["ss"]
             # t["ss2"] = "_" if t["ss2"] in ["NONSNACS", "p.NONSNACS"] else t["ss2"]
 
-            smwe_tok_ids = "_" if ":" not in t["smwe"] else smwes[t["smwe"].split(":")[0]]
-            t["lexcat"] = compute_lexcat(t["id"], t["smwe"], smwe_tok_ids, t["ss"], t["lexlemma"], poses, deps)
+            lexcats.append(_table_lexcat(_LEXCAT_TABLE, _lexcat_rule, t))
+
+        # Only the tokens the table cannot decide need the rest of the sentence. POS tags are
+        # taken before any are changed below.
+        if FALLBACK in lexcats:
+            smwes, _ = sentence_index(sentence).mwes()
+            poses = [(t["upos"], t["xpos"]) for t in sentence]
+            deps = [(t["head"], t["deprel"]) for t in sentence]
+            for i, t in enumerate(sentence):
+                if lexcats[i] is FALLBACK:
+                    smwe_tok_ids = "_" if ":" not in t["smwe"] else smwes[t["smwe"].split(":")[0]]
+                    lexcats[i] = compute_lexcat(t["id"], t["smwe"], smwe_tok_ids, t["ss"], t["lexlemma"], poses, deps)
+
+        for t, lexcat in zip(sentence, lexcats):
+            t["lexcat"] = lexcat
             # Check if we had a shorthand anno--tolerate an incorrect "p." prefix
             if t["ss"][0] == "`":
                 # If it was for `i, force SCONJ+CC pos tags
@@ -361,14 +528,15 @@ def add_lexcat(sentences):
 
 def add_lexlemma(sentences):
     for sentence in sentences:
+        index = sentence_index(sentence)
         for t in sentence:
             # don't touch smwe tokens with existing lemmas
             if t["smwe"] != "_" and t["lexlemma"] != "_":
                 pass
             elif t["smwe"] != "_" and t["smwe"].split(":")[1] == "1":
-                smwes, _ = read_mwes(sentence)
+                smwes, _ = index.mwes()
                 smwe_id = t["smwe"].split(":")[0]
-                lexlemma = " ".join([get_token(sentence, tok_id)["lemma"] for tok_id in smwes[smwe_id]])
+                lexlemma = " ".join([index.token(tok_id)["lemma"] for tok_id in smwes[smwe_id]])
                 t["lexlemma"] = lexlemma
             # otherwise, copy
             elif t["smwe"] == "_":
@@ -376,17 +544,12 @@ def add_lexlemma(sentences):
 
 
 def prefix_prepositional_supersenses(sentences):
-    for sentence in sentences:
-        for t in sentence:
-            if t["ss"] != "_" and t["ss"] not in special_labels:
-                t["ss"] = "p." + t["ss"]
-            if t["ss2"] != "_" and t["ss2"] not in special_labels:
-                t["ss2"] = "p." + t["ss2"]
+    return normalize_supersenses(sentences, "prefix_prepositional")
 
 
 def add_mwe_metadatum(sentences):
     for sentence in sentences:
-        smwes, wmwes = read_mwes(sentence)
+        smwes, wmwes = sentence_index(sentence).mwes()
         if "mwe" not in sentence.metadata:
             sentence.metadata["mwe"] = render(
                 [t["form"] for t in sentence],
@@ -397,10 +560,7 @@ def add_mwe_metadatum(sentences):
 
 
 def dedupe_question_marks(sentences):
-    for sentence in sentences:
-        for t in sentence:
-            if t["ss"] == "??" and t["ss2"] == "??" "":
-                t["ss2"] = "_"
+    return normalize_supersenses(sentences, "dedupe_question_marks")
 
 
 def assign_sent_id(sentences):
@@ -417,7 +577,8 @@ def make_compound_prts_smwes(sentences):
     If a token has the deprel compound:prt and it's not in a SMWE, make a SMWE out of it and its head
     """
     for sentence in sentences:
-        smwes, wmwes = read_mwes(sentence)
+        index = sentence_index(sentence)
+        smwes, wmwes = index.mwes()
         next_mwe_id = len(smwes) + len(wmwes) + 1
 
         for i, t in enumerate(sentence):
@@ -426,15 +587,15 @@ def make_compound_prts_smwes(sentences):
             #    print("@!", t)
             if t["deprel"] == "compound:prt" and t["ss"] == "_" and t["smwe"] == "_" and t["wmwe"] == "_":
                 # print(sentence.metadata['sent_id'])
-                head = get_token(sentence, t["head"])
+                head = index.token(t["head"])
 
                 # Skip if compound:prt is to the left of head--this is a parse error
                 if not int(head["id"]) < int(t["id"]):
                     continue
 
                 # Assign SMWE
-                head["smwe"] = f"{next_mwe_id}:1"
-                t["smwe"] = f"{next_mwe_id}:2"
+                index.set_mwe(head, "smwe", f"{next_mwe_id}:1")
+                index.set_mwe(t, "smwe", f"{next_mwe_id}:2")
 
                 # Fix lexlemma
                 t["lexlemma"] = "_"
@@ -445,7 +606,8 @@ def make_compound_prts_smwes(sentences):
 
 def renumber_mwes(sentences):
     for sentence in sentences:
-        smwes, wmwes = read_mwes(sentence)
+        index = sentence_index(sentence)
+        smwes, wmwes = index.mwes()
         mwes = [(mwe_id, toknums, "strong") for mwe_id, toknums in smwes.items()] + [
             (mwe_id, toknums, "weak") for mwe_id, toknums in wmwes.items()
         ]
@@ -454,49 +616,453 @@ def renumber_mwes(sentences):
         for new_id, (_, toknums, strength) in enumerate(mwes, start=1):
             # also sort toknums just in case
             for mwe_token_count, toknum in enumerate(sorted(toknums), start=1):
-                tok = get_token(sentence, toknum)
-                tok["smwe" if strength == "strong" else "wmwe"] = f"{new_id}:{mwe_token_count}"
+                tok = index.token(toknum)
+                index.set_mwe(tok, "smwe" if strength == "strong" else "wmwe", f"{new_id}:{mwe_token_count}")
 
 
 def capitalize_supersenses(sentences):
-    valid_ss = {ss.lower(): ss for ss in PSS}
+    return normalize_supersenses(sentences, "capitalize")
+
+
+# supersense normalization --------------------------------------------------------------
+_CAPITALIZED_PSS = {ss.lower(): ss for ss in PSS}
+
+
+def _prefix_prepositional(label):
+    return "p." + label if label != "_" and label not in special_labels else label
+
+
+def _strip_shorthand_prefix(label):
+    # hindi idiosyncrasy--should be `d not p.`d
+    return label[2:] if len(label) > 2 and label[:3] == "p.`" else label
+
+
+def _capitalize(label):
+    return _CAPITALIZED_PSS.get(label, label) if label.startswith("p.") else label
+
+
+# Rewrites of a token's (ss, ss2) that normalize_supersenses can apply
+SUPERSENSE_RULES = {
+    # ?? in both columns is the same as ?? in ss alone
+    "dedupe_question_marks": lambda ss, ss2: (ss, "_") if ss == "??" and ss2 == "??" else (ss, ss2),
+    # Supersenses annotated without their "p." prefix
+    "prefix_prepositional": lambda ss, ss2: (_prefix_prepositional(ss), _prefix_prepositional(ss2)),
+    # Lowercased prepositional supersenses, e.g. p.locus for p.Locus
+    "capitalize": lambda ss, ss2: (_capitalize(ss), _capitalize(ss2)),
+}
+
+_NORMALIZATION_TABLES = {}
+
+
+def _normalization_table(rules):
+    if rules not in _NORMALIZATION_TABLES:
+        for rule in rules:
+            if rule not in SUPERSENSE_RULES:
+                raise Exception(f"Unknown supersense normalization rule: {rule}")
+        _NORMALIZATION_TABLES[rules] = {}
+    return _NORMALIZATION_TABLES[rules]
+
+
+def _normalize_pair(rules, pair):
+    fired = []
+    for rule in rules:
+        rewritten = SUPERSENSE_RULES[rule](*pair)
+        if rewritten != pair:
+            fired.append(rule)
+            pair = rewritten
+    return pair, tuple(fired)
+
+
+def normalize_supersenses(sentences, *rules):
+    """
+    Apply the `SUPERSENSE_RULES` named by `rules`, in order, to the ss and ss2 columns of every token in one
+    pass. What the rules make of each (ss, ss2) pair is worked out the first time it is seen and kept in a
+    table for these rules, so most tokens cost one lookup.
+
+    Returns: a `Counter` of how many tokens each rule rewrote.
+    """
+    table = _normalization_table(rules)
+    rewrites = Counter()
     for sentence in sentences:
-        for token in sentence:
-            for key in ["ss", "ss2"]:
-                if token[key].startswith("p."):
-                    for ss, ss_cap in valid_ss.items():
-                        if token[key] == ss:
-                            token[key] = ss_cap
+        for t in sentence:
+            pair = (t["ss"], t["ss2"])
+            entry = table.get(pair)
+            if entry is None:
+                entry = table[pair] = _normalize_pair(rules, pair)
+            (ss, ss2), fired = entry
+            if fired:
+                t["ss"] = ss
+                t["ss2"] = ss2
+                rewrites.update(fired)
+    return rewrites
+
+
+def _report_supersense_rewrites(rewrites, file=sys.stderr):
+    if rewrites:
+        counts = ", ".join(f"{rule} {n}" for rule, n in rewrites.items())
+        print(f"Supersenses rewritten: {counts}", file=file)
+
 
+PIPELINE_PROCESSORS = "tokenize,pos,lemma,depparse"
 
-def run_through_pipeline(sentences, stanza_language_code):
+
+@lru_cache(maxsize=None)
+def _load_stanza_pipeline(stanza_language_code):
+    # Loaded once per process, as the subtask may be run once per chunk of sentences
     import stanza
 
     stanza.download(stanza_language_code)
-    nlp = stanza.Pipeline(
-        lang=stanza_language_code, tokenize_pretokenized=True, processors="tokenize,pos,lemma,depparse"
-    )
+    nlp = stanza.Pipeline(lang=stanza_language_code, tokenize_pretokenized=True, processors=PIPELINE_PROCESSORS)
+
+    print("Beginning processing...", file=sys.stderr)
+    return nlp
+
+
+@lru_cache(maxsize=None)
+def _pipeline_model_id(stanza_language_code):
+    """Everything a parse depends on besides the tokens: the language, the processors, and the model version."""
+    import stanza
+    from stanza.resources import common
+
+    resources_version = getattr(common, "DEFAULT_RESOURCES_VERSION", None)
+    return [stanza_language_code, PIPELINE_PROCESSORS, stanza.__version__, resources_version]
+
+
+# The parts of a parsed word that run_through_pipeline copies into a token. feats is a UD feature string or None.
+ParsedWord = namedtuple("ParsedWord", ["lemma", "upos", "xpos", "feats", "head", "deprel"])
+
+
+def _syntactic_words(sentence):
+    """The tokens of a sentence that get parsed: all but multiword tokens (e.g. 2-3) and empty nodes (e.g. 6.1)."""
+    return [t for t in sentence if isinstance(t["id"], int)]
+
+
+class TaggerBackend:
+    """
+    Where run_through_pipeline gets its parses from. `parse` takes a list of sentences and returns, for each
+    of them, a list with one `ParsedWord` per token in `_syntactic_words(sentence)`. Backends whose `model_id` is not None have their parses
+    stored in the `ParseCache` under it.
+    """
+
+    model_id = None
+
+    def parse(self, sentences):
+        raise NotImplementedError()
+
+    def close(self):
+        pass
 
-    print("Beginning processing...")
-    for sentence in tqdm(sentences):
-        tokens = " ".join([t["form"] for t in sentence])
-        doc = nlp(tokens)
-        assert len(doc.sentences) == 1
-        for i, o in enumerate(doc.sentences[0].words):
-            t = sentence[i]
-            t["lemma"] = o.lemma
-            t["upos"] = o.upos
-            t["xpos"] = o.xpos
-            feats = o.feats
-            if feats:
-                feats = {v.split("=")[0]: v.split("=")[1] for v in feats.split("|")}
-                if len(feats) == 0:
-                    feats = "_"
+
+class StanzaBackend(TaggerBackend):
+    """Parse sentences with a Stanza pipeline for the given language, downloading its models if needed."""
+
+    def __init__(self, stanza_language_code):
+        self.stanza_language_code = stanza_language_code
+
+    @property
+    def model_id(self):
+        return _pipeline_model_id(self.stanza_language_code)
+
+    def parse(self, sentences):
+        nlp = _load_stanza_pipeline(self.stanza_language_code)
+        doc = nlp([[t["form"] for t in _syntactic_words(sentence)] for sentence in sentences])
+        if len(doc.sentences) != len(sentences):
+            raise Exception(f"Sent {len(sentences)} sentences through the pipeline, but got {len(doc.sentences)} back")
+        return [
+            [ParsedWord(w.lemma, w.upos, w.xpos, w.feats, w.head, w.deprel) for w in parsed.words]
+            for parsed in doc.sentences
+        ]
+
+
+class ConlluBackend(TaggerBackend):
+    """
+    Take existing parses from a CoNLL-U file, matching its sentences to ours by `sent_id` and their words to
+    our tokens by ID. The file is read alongside the corpus, so when both are in the same order only one of
+    its sentences is held in memory at a time. Sentences that are skipped over while looking for a `sent_id`
+    are kept until they are asked for, up to `max_skipped` of them; if more are skipped (e.g. when resuming
+    partway through the corpus), the oldest are dropped and the file is read again from the start should one
+    of them be asked for.
+    """
+
+    def __init__(self, conllu_path, max_skipped=10000):
+        self.conllu_path = conllu_path
+        self.max_skipped = max_skipped
+        self._file = None
+        self._open()
+
+    def _open(self):
+        if self._file is not None:
+            self._file.close()
+        self._file = open_file(self.conllu_path)
+        self._parses = conllu.parse_incr(self._file)
+        self._skipped = {}
+        self._dropped = False
+
+    def _scan(self, sent_id):
+        for parse in self._parses:
+            words = [
+                (
+                    t["id"],
+                    ParsedWord(
+                        t["lemma"],
+                        t["upos"],
+                        t["xpos"],
+                        "|".join(f"{k}={v}" for k, v in t["feats"].items()) if t["feats"] else None,
+                        t["head"],
+                        t["deprel"],
+                    ),
+                )
+                for t in _syntactic_words(parse)
+            ]
+            parse_sent_id = parse.metadata.get("sent_id")
+            if parse_sent_id == sent_id:
+                return words
+            self._skipped[parse_sent_id] = words
+            if len(self._skipped) > self.max_skipped:
+                del self._skipped[next(iter(self._skipped))]
+                self._dropped = True
+        return None
+
+    def _find(self, sent_id):
+        if sent_id in self._skipped:
+            return self._skipped.pop(sent_id)
+        words = self._scan(sent_id)
+        if words is None and self._dropped:
+            self._open()
+            words = self._scan(sent_id)
+        if words is None:
+            raise Exception(f"Sentence {sent_id} not found in {self.conllu_path}")
+        return words
+
+    def parse(self, sentences):
+        parses = []
+        for sentence in sentences:
+            if "sent_id" not in sentence.metadata:
+                raise Exception(f"Parses can only be taken from {self.conllu_path} for sentences with a sent_id")
+            sent_id = sentence.metadata["sent_id"]
+            words = self._find(sent_id)
+            ids = [t["id"] for t in _syntactic_words(sentence)]
+            if [tid for tid, _ in words] != ids:
+                raise Exception(
+                    f"The token IDs of {sent_id} in {self.conllu_path} do not match those of the sentence: "
+                    f"{' '.join(str(tid) for tid, _ in words)} vs. {' '.join(str(tid) for tid in ids)}"
+                )
+            parses.append([word for _, word in words])
+        return parses
+
+    def close(self):
+        self._file.close()
+
+
+_BACKENDS = {}
+
+
+def _open_backend(stanza_language_code, parses_path):
+    # Kept open across calls, since the subtask may be run once per chunk of sentences
+    key = (stanza_language_code, parses_path)
+    if key not in _BACKENDS:
+        _BACKENDS[key] = StanzaBackend(stanza_language_code) if parses_path is None else ConlluBackend(parses_path)
+    return _BACKENDS[key]
+
+
+class SQLiteCache:
+    """
+    Per-sentence results kept as text in an SQLite file across runs, keyed by a hash of everything they depend
+    on. Counts how many lookups hit, for `report`.
+    """
+
+    name = "Cache"
+
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.lookups = 0
+        self._db = sqlite3.connect(path)
+        self._db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    @staticmethod
+    def hash(*parts):
+        return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        self.lookups += 1
+        row = self._db.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put_many(self, entries):
+        with self._db:
+            self._db.executemany("INSERT OR REPLACE INTO entries (key, value) VALUES (?, ?)", entries)
+
+    def report(self, file=sys.stderr):
+        (size,) = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()
+        hit_rate = self.hits / self.lookups if self.lookups else 0.0
+        print(
+            f"{self.name} {self.path}: {self.hits}/{self.lookups} hits ({hit_rate:.1%}), "
+            f"{size} sentences, {os.path.getsize(self.path) / 2**20:.1f} MiB",
+            file=file,
+        )
+
+    def close(self):
+        self._db.close()
+
+
+class ParseCache(SQLiteCache):
+    """
+    Parses made by run_through_pipeline. An entry holds the `ParsedWord`s of one sentence and is keyed by
+    a hash of the sentence's tokens and of the `_pipeline_model_id`, so a sentence is only parsed again
+    if its tokens or the model have changed.
+    """
+
+    name = "Parse cache"
+
+    @classmethod
+    def key(cls, model_id, forms):
+        return cls.hash(model_id, forms)
+
+    def get(self, key):
+        value = super().get(key)
+        return None if value is None else [ParsedWord(*word) for word in json.loads(value)]
+
+    def put_many(self, entries):
+        super().put_many([(key, json.dumps([list(word) for word in words])) for key, words in entries])
+
+
+# Bump whenever a change to the subtasks changes what they make of a sentence, so that old entries are not used
+ENRICHMENT_CACHE_VERSION = 1
+
+
+class EnrichmentCache(SQLiteCache):
+    """
+    Enriched sentences, serialized. An entry is keyed by a hash of the input sentence's text, of the list of
+    subtasks run on it and of what else they depend on (see `_subtask_inputs`), so that only sentences that
+    were edited since the last run, or that were never enriched this way, need to be enriched again.
+
+    Sentences without a sent_id are not cached if assign_sent_id is run, since each of them must get a new one.
+    """
+
+    name = "Enrichment cache"
+
+    def __init__(self, path, subtasks, subtask_options=None):
+        super().__init__(path)
+        self.subtasks = subtasks
+        self.inputs = _subtask_inputs(subtasks, subtask_options)
+        self._assigns_sent_ids = "assign_sent_id" in map(_subtask_key, subtasks)
+
+    def key(self, raw_sentence):
+        """Returns None for a sentence that must not be cached."""
+        if self._assigns_sent_ids and not _has_sent_id(raw_sentence):
+            return None
+        return self.hash(ENRICHMENT_CACHE_VERSION, self.subtasks, self.inputs, raw_sentence)
+
+
+def _subtask_inputs(subtasks, subtask_options=None):
+    """
+    What the subtasks make of a sentence depends on besides its text: their `subtask_options`, and for
+    run_through_pipeline, the file its parses are taken from or else the Stanza models.
+    """
+    subtask_options = subtask_options or {}
+    inputs = {}
+    for subtask in subtasks:
+        subtask_key = _subtask_key(subtask)
+        options = dict(subtask_options.get(subtask_key, {}))
+        if subtask_key == "run_through_pipeline":
+            parses_path = options.get("parses_path")
+            if parses_path is not None:
+                stat = os.stat(parses_path)
+                options["parses_path"] = [os.path.abspath(parses_path), stat.st_size, stat.st_mtime_ns]
+            elif not isinstance(subtask, str):
+                options["model_id"] = _pipeline_model_id(subtask[1])
+        inputs[subtask_key] = options
+    return inputs
+
+
+def _has_sent_id(raw_sentence):
+    for line in raw_sentence.split("\n"):
+        if line.startswith("#") and any(key == "sent_id" for key, _ in parse_comment_line(line)):
+            return True
+    return False
+
+
+_PARSE_CACHES = {}
+
+
+def _open_parse_cache(path):
+    if path not in _PARSE_CACHES:
+        _PARSE_CACHES[path] = ParseCache(path)
+    return _PARSE_CACHES[path]
+
+
+def _close_pipeline_resources():
+    """Close the backends and parse caches used since the last call, reporting the caches' statistics."""
+    while _BACKENDS:
+        _, backend = _BACKENDS.popitem()
+        backend.close()
+    while _PARSE_CACHES:
+        _, cache = _PARSE_CACHES.popitem()
+        cache.report()
+        cache.close()
+
+
+# Number of sentences sent to the Stanza pipeline per call
+PIPELINE_BATCH_SIZE = 32
+
+
+def run_through_pipeline(
+    sentences, stanza_language_code, batch_size=PIPELINE_BATCH_SIZE, cache_path=None, parses_path=None
+):
+    """
+    Fill in lemma, upos, xpos, feats, head and deprel for every token. These come from a Stanza pipeline,
+    or from the CoNLL-U file at `parses_path` if one is given (see `ConlluBackend`).
+    """
+    backend = _open_backend(stanza_language_code, parses_path)
+    model_id = backend.model_id if cache_path is not None else None
+    cache = _open_parse_cache(cache_path) if model_id is not None else None
+
+    # Progress is only worth reporting when there is more than one call to make
+    with tqdm(total=len(sentences), disable=len(sentences) <= batch_size) as progress:
+        for batch in _iter_chunks(sentences, batch_size):
+            if cache is not None:
+                keys = [ParseCache.key(model_id, [t["form"] for t in _syntactic_words(sentence)]) for sentence in batch]
+                parses = [cache.get(key) for key in keys]
             else:
+                parses = [None] * len(batch)
+
+            misses = [i for i, words in enumerate(parses) if words is None]
+            if misses:
+                for i, words in zip(misses, backend.parse([batch[i] for i in misses])):
+                    parses[i] = words
+                if cache is not None:
+                    cache.put_many([(keys[i], parses[i]) for i in misses])
+
+            for sentence, words in zip(batch, parses):
+                tokens = _syntactic_words(sentence)
+                if len(words) != len(tokens):
+                    raise Exception(
+                        f"The pipeline returned {len(words)} tokens for {sentence.metadata.get('sent_id')}, "
+                        f"which has {len(tokens)}"
+                    )
+                _copy_parse(tokens, words)
+            progress.update(len(batch))
+
+
+def _copy_parse(tokens, words):
+    for t, o in zip(tokens, words):
+        t["lemma"] = o.lemma
+        t["upos"] = o.upos
+        t["xpos"] = o.xpos
+        feats = o.feats
+        if feats:
+            feats = {v.split("=")[0]: v.split("=")[1] for v in feats.split("|")}
+            if len(feats) == 0:
                 feats = "_"
-            t["feats"] = feats
-            t["head"] = o.head
-            t["deprel"] = o.deprel
+        else:
+            feats = "_"
+        t["feats"] = feats
+        t["head"] = o.head
+        t["deprel"] = o.deprel
 
 
 SUBTASKS = {
@@ -512,22 +1078,522 @@ SUBTASKS = {
     "renumber_mwes": renumber_mwes,
     "assign_sent_id": assign_sent_id,
     "capitalize_supersenses": capitalize_supersenses,
+    "normalize_supersenses": normalize_supersenses,
     "run_through_pipeline": run_through_pipeline,
 }
 
+# What a subtask reads and writes: token columns by name, and sentence metadata fields as "metadata:<key>".
+# Batched subtasks work on many sentences at once (see `BATCHED_SUBTASKS`). `done`, if given, tells whether
+# the subtask would leave a sentence as it is, so that the sentence can be skipped.
+SubtaskSpec = namedtuple("SubtaskSpec", ["reads", "writes", "batched", "done"], defaults=[False, None])
+
+SUBTASK_SPECS = {
+    "dedupe_question_marks": SubtaskSpec(reads=("ss", "ss2"), writes=("ss2",)),
+    "make_compound_prts_smwes": SubtaskSpec(
+        reads=("ss", "lemma", "head", "deprel", "smwe", "wmwe"), writes=("smwe", "lexlemma")
+    ),
+    "add_mwe_metadatum": SubtaskSpec(
+        reads=("form", "smwe", "wmwe"),
+        writes=("metadata:mwe",),
+        done=lambda sentence: "mwe" in sentence.metadata,
+    ),
+    "add_lexlemma": SubtaskSpec(reads=("lemma", "smwe", "lexlemma"), writes=("lexlemma",)),
+    "add_wlemma": SubtaskSpec(reads=("lemma", "wmwe"), writes=("wlemma",)),
+    "prefix_prepositional_supersenses": SubtaskSpec(reads=("ss", "ss2"), writes=("ss", "ss2")),
+    "add_lexcat_la": SubtaskSpec(
+        reads=("form", "upos", "xpos", "feats", "head", "deprel", "smwe", "lexlemma", "ss", "ss2"),
+        writes=("upos", "xpos", "lexcat", "ss", "ss2"),
+    ),
+    "add_lexcat": SubtaskSpec(
+        reads=("form", "upos", "xpos", "head", "deprel", "smwe", "lexlemma", "ss", "ss2"),
+        writes=("upos", "xpos", "lexcat", "ss", "ss2"),
+    ),
+    "add_lextag": SubtaskSpec(reads=("smwe", "wmwe", "lexcat", "ss", "ss2"), writes=("lextag",)),
+    "renumber_mwes": SubtaskSpec(reads=("smwe", "wmwe"), writes=("smwe", "wmwe")),
+    "assign_sent_id": SubtaskSpec(
+        reads=("metadata:sent_id",),
+        writes=("metadata:sent_id",),
+        done=lambda sentence: "sent_id" in sentence.metadata,
+    ),
+    "capitalize_supersenses": SubtaskSpec(reads=("ss", "ss2"), writes=("ss", "ss2")),
+    "normalize_supersenses": SubtaskSpec(reads=("ss", "ss2"), writes=("ss", "ss2")),
+    "run_through_pipeline": SubtaskSpec(
+        reads=("form",), writes=("lemma", "upos", "xpos", "feats", "head", "deprel"), batched=True
+    ),
+}
 
-def main(conllulex_input_path, conllulex_output_path, subtasks):
-    sentences = get_conllulex_tokenlists(conllulex_input_path)
 
+def check_subtask_order(subtasks):
+    """
+    Returns a warning for every subtask in `subtasks` that reads a field which is only filled in by a
+    subtask later in the list. (A later subtask that also reads the field only rewrites it, as
+    renumber_mwes does with smwe, and does not count.)
+    """
+    warnings = []
+    keys = [_subtask_key(subtask) for subtask in subtasks]
+    for key in keys:
+        if key not in SUBTASK_SPECS:
+            raise Exception(f"Unknown enrichment subtask: {key}")
+    for i, key in enumerate(keys):
+        for field in SUBTASK_SPECS[key].reads:
+            if any(field in SUBTASK_SPECS[earlier].writes for earlier in keys[:i]):
+                continue
+            for later in keys[i + 1 :]:
+                spec = SUBTASK_SPECS[later]
+                if field in spec.writes and field not in spec.reads:
+                    warnings.append(f"{key} reads {field}, which is only filled in by {later} after it")
+                    break
+    return warnings
+
+
+def _resolve_subtasks(subtasks, subtask_options=None):
+    """
+    Look up the function of every subtask, returning `(function, args, kwargs)` triples. `subtask_options`
+    maps subtask names to keyword arguments for them, e.g. `{"run_through_pipeline": {"batch_size": 8}}`.
+    """
+    subtask_options = subtask_options or {}
+    resolved = []
     for subtask in subtasks:
         has_args = not isinstance(subtask, str)
-        subtask_key = subtask[0] if has_args else subtask
+        subtask_key = _subtask_key(subtask)
         if subtask_key not in SUBTASKS:
             raise Exception(f"Unknown enrichment subtask: {subtask_key}")
-        if has_args:
-            SUBTASKS[subtask_key](sentences, *subtask[1:])
+        args = tuple(subtask[1:]) if has_args else ()
+        resolved.append((SUBTASKS[subtask_key], args, subtask_options.get(subtask_key, {})))
+    return resolved
+
+
+def _pending(sentences, subtask):
+    done = SUBTASK_SPECS[_subtask_key(subtask)].done
+    if done is None:
+        return sentences
+    return [sentence for sentence in sentences if not done(sentence)]
+
+
+def _run_subtasks(sentences, subtasks, subtask_options=None, profile=None, rewrites=None):
+    """
+    Run `subtasks` on `sentences`: all subtasks on one sentence before moving on to the next, or, if a
+    `profile` is given, one pass over all sentences per subtask, so that each pass is measured as a whole.
+    No subtask looks beyond the sentence it is modifying, so both give the same result. (Subtasks in
+    `BATCHED_SUBTASKS` always get all of `sentences` at once, in their place in the order.) Sentences that a
+    subtask's `SubtaskSpec` says are already done are not given to it. The supersense rewrites reported by
+    `normalize_supersenses` are added to `rewrites`, if given.
+    """
+    if profile is not None:
+        for subtask, (function, args, kwargs) in zip(subtasks, _resolve_subtasks(subtasks, subtask_options)):
+            pending = _pending(sentences, subtask)
+            if pending:
+                _call_subtask(profile, rewrites, subtask, function, pending, args, kwargs)
+        return
+
+    for batched, segment in _split_subtasks(subtasks):
+        resolved = _resolve_subtasks(segment, subtask_options)
+        if batched:
+            for subtask, (function, args, kwargs) in zip(segment, resolved):
+                pending = _pending(sentences, subtask)
+                if pending:
+                    _call_subtask(profile, rewrites, subtask, function, pending, args, kwargs)
+        else:
+            steps = [(subtask, SUBTASK_SPECS[_subtask_key(subtask)].done, *r) for subtask, r in zip(segment, resolved)]
+            for sentence in sentences:
+                one = [sentence]
+                for subtask, done, function, args, kwargs in steps:
+                    if done is None or not done(sentence):
+                        _call_subtask(profile, rewrites, subtask, function, one, args, kwargs)
+
+
+def _call_subtask(profile, rewrites, subtask, function, sentences, args, kwargs):
+    if profile is None:
+        result = function(sentences, *args, **kwargs)
+    else:
+        result = profile.run(subtask, function, sentences, args, kwargs)
+    # Subtasks that normalize supersenses return how many of each rewrite they made
+    if rewrites is not None and isinstance(result, Counter):
+        rewrites.update(result)
+
+
+def _iter_enriched(sentences, subtasks, subtask_options=None, profile=None, rewrites=None):
+    # Each chunk of sentences is parsed, enriched and serialized before the next
+    for chunk in _iter_chunks(sentences, CHUNK_SIZE):
+        _run_subtasks(chunk, subtasks, subtask_options, profile, rewrites)
+        for sentence in chunk:
+            yield serialize_conllulex_sentence(sentence)
+
+
+# Subtasks that work on many sentences at once, e.g. to batch them through a large model held in memory.
+# Runs with --jobs execute them in the main process, and runs that go a chunk at a time hand them a chunk
+# of sentences at a time instead of one, in order with the other subtasks.
+BATCHED_SUBTASKS = {name for name, spec in SUBTASK_SPECS.items() if spec.batched}
+
+# Number of sentences enriched and written out at a time, e.g. by a worker process or in a fused run
+CHUNK_SIZE = 64
+
+
+def _subtask_key(subtask):
+    return subtask if isinstance(subtask, str) else subtask[0]
+
+
+def _split_subtasks(subtasks):
+    """Split a subtask list into consecutive `(batched, subtasks)` segments."""
+    segments = []
+    for subtask in subtasks:
+        batched = _subtask_key(subtask) in BATCHED_SUBTASKS
+        if segments and segments[-1][0] == batched:
+            segments[-1][1].append(subtask)
+        else:
+            segments.append((batched, [subtask]))
+    return segments
+
+
+def _parse_chunk(chunk):
+    # Sentences are passed between processes either as conllulex text or as packed `conllu.TokenList`s
+    return [parse_conllulex_sentence(s.split("\n")) if isinstance(s, str) else unpack_tokenlist(s) for s in chunk]
+
+
+def _enrich_chunk(chunk, subtasks, serialize, subtask_options, profile=False):
+    # Returns the enriched chunk along with what the main process needs to account for it: the supersense
+    # rewrites it took, and, if `profile`, a `SubtaskProfile` of it
+    chunk_profile = SubtaskProfile() if profile else None
+    rewrites = Counter()
+    sentences = _parse_chunk(chunk)
+    _run_subtasks(sentences, subtasks, subtask_options, chunk_profile, rewrites)
+    if serialize:
+        return [serialize_conllulex_sentence(s) for s in sentences], rewrites, chunk_profile
+    return [pack_tokenlist(s) for s in sentences], rewrites, chunk_profile
+
+
+def _merge_chunk_profile(result, profile, rewrites):
+    chunk, chunk_rewrites, chunk_profile = result
+    if rewrites is not None:
+        rewrites.update(chunk_rewrites)
+    if profile is not None:
+        profile.merge(chunk_profile)
+    return chunk
+
+
+def _iter_chunks(items, size):
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _run_segment_in_pool(pool, chunks, subtasks, serialize, subtask_options, jobs, profile=None, rewrites=None):
+    # Keep a bounded number of chunks in flight and hand back results in the order they were submitted
+    pending = deque()
+    for chunk in chunks:
+        pending.append(pool.submit(_enrich_chunk, chunk, subtasks, serialize, subtask_options, profile is not None))
+        if len(pending) >= 2 * jobs:
+            yield _merge_chunk_profile(pending.popleft().result(), profile, rewrites)
+    while pending:
+        yield _merge_chunk_profile(pending.popleft().result(), profile, rewrites)
+
+
+def _run_segment_serially(chunks, subtasks, serialize, subtask_options, profile=None, rewrites=None):
+    for chunk in chunks:
+        result = _enrich_chunk(chunk, subtasks, serialize, subtask_options, profile is not None)
+        yield _merge_chunk_profile(result, profile, rewrites)
+
+
+def _iter_enriched_parallel(pool, sentences, subtasks, jobs, subtask_options, profile=None, rewrites=None):
+    chunks = _iter_chunks(sentences, CHUNK_SIZE)
+    segments = _split_subtasks(subtasks) or [(False, [])]
+    for i, (batched, segment) in enumerate(segments):
+        serialize = i == len(segments) - 1
+        if batched:
+            chunks = _run_segment_serially(chunks, segment, serialize, subtask_options, profile, rewrites)
+        else:
+            chunks = _run_segment_in_pool(pool, chunks, segment, serialize, subtask_options, jobs, profile, rewrites)
+    for chunk in chunks:
+        yield from chunk
+
+
+CHECKPOINT_VERSION = 2
+# Number of sentences enriched between two checkpoints
+CHECKPOINT_EVERY = 1000
+
+
+class Checkpoint:
+    """
+    The progress of an enrichment run, so that it can be resumed if it is interrupted. The sentences enriched
+    so far are written to `<output_path>.partial`, which is moved into place once the run is complete.
+    Every `every` sentences, `<output_path>.checkpoint` records how many sentences and bytes of the partial
+    output are complete, along with the input file, subtasks, and `subtask_options` they were made with
+    (see `_subtask_inputs`).
+    """
+
+    def __init__(self, input_path, output_path, subtasks, subtask_options=None, every=CHECKPOINT_EVERY):
+        self.output_path = output_path
+        self.path = output_path + ".checkpoint"
+        self.partial_path = output_path + ".partial"
+        self.every = every
+        self.sentences = 0
+        self.bytes = 0
+        stat = os.stat(input_path)
+        self._run = {
+            "version": CHECKPOINT_VERSION,
+            "input": os.path.abspath(input_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "subtasks": json.loads(json.dumps(subtasks)),
+            "inputs": json.loads(json.dumps(_subtask_inputs(subtasks, subtask_options))),
+        }
+
+    def start(self, resume):
+        """Returns the number of input sentences that are already enriched, which is 0 unless resuming."""
+        if not resume:
+            return 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            print(f"No checkpoint found at {self.path}, starting from the beginning", file=sys.stderr)
+            return 0
+        if {k: state.get(k) for k in self._run} != self._run:
+            raise Exception(
+                f"{self.path} was made with a different input file, subtasks or options. Delete it to start over."
+            )
+        if not os.path.exists(self.partial_path) or os.path.getsize(self.partial_path) < state["bytes"]:
+            raise Exception(
+                f"{self.partial_path} is missing or shorter than {self.path} says. Delete both to start over."
+            )
+        self.sentences = state["sentences"]
+        self.bytes = state["bytes"]
+        print(f"Resuming after {self.sentences} sentences", file=sys.stderr)
+        return self.sentences
+
+    def write(self, enriched):
+        """Append serialized sentences to the partial output, saving checkpoints along the way, and finish it."""
+        with open(self.partial_path, "r+b" if self.bytes else "wb") as f:
+            # Anything written after the last checkpoint is written again
+            f.truncate(self.bytes)
+            f.seek(self.bytes)
+            for serialized in enriched:
+                f.write(serialized.encode("utf-8"))
+                self.sentences += 1
+                if self.sentences % self.every == 0:
+                    self._save(f)
+
+        if is_compressed(self.output_path):
+            with open(self.partial_path, "r", encoding="utf-8") as src, open_file(self.output_path, "w") as dst:
+                shutil.copyfileobj(src, dst)
+            os.unlink(self.partial_path)
         else:
-            SUBTASKS[subtask_key](sentences)
+            os.replace(self.partial_path, self.output_path)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def _save(self, f):
+        f.flush()
+        os.fsync(f.fileno())
+        self.bytes = f.tell()
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as state_file:
+            json.dump(dict(self._run, sentences=self.sentences, bytes=self.bytes), state_file)
+        os.replace(tmp_path, self.path)
+
+
+def main(
+    conllulex_input_path,
+    conllulex_output_path,
+    subtasks,
+    cache_dir=None,
+    jobs=1,
+    fused=False,
+    subtask_options=None,
+    checkpoint_every=None,
+    resume=False,
+    incremental_path=None,
+    profile=None,
+):
+    """
+    Run `subtasks` on every sentence of a conllulex file and write the result out to the output path.
+    Subtasks that read a field before a later subtask fills it in are reported by `check_subtask_order`.
+
+    Consecutive subtasks that are not batched share one pass over the sentences, running on one sentence
+    before moving on to the next, while batched subtasks get all the sentences at once (see `_run_subtasks`).
+
+    By default, the whole corpus is read before anything is written. If `fused`, it is instead read,
+    enriched and written out in chunks of `CHUNK_SIZE` sentences, so that memory use does not grow with
+    the corpus; batched subtasks then get a chunk at a time. This is always done when reading from or
+    writing to a pipe ("-"), but not when the output path is the input file itself.
+
+    With `jobs` > 1, the sentences are enriched in chunks by a pool of `jobs` worker processes (except for
+    the subtasks in `BATCHED_SUBTASKS`), and written out in their original order. `fused` means the same
+    with and without `jobs`.
+
+    The output is the same in all cases. `subtask_options` maps subtask names to extra keyword arguments
+    for them, e.g. `{"run_through_pipeline": {"batch_size": 8}}`.
 
-    with open(conllulex_output_path, "w") as f:
-        f.write("".join(s.serialize() for s in sentences))
+    If `checkpoint_every` is given, the run is fused and a `Checkpoint` is saved every `checkpoint_every`
+    sentences. With `resume`, a run picks up from the last checkpoint saved for its output path.
+
+    If `incremental_path` is given, enriched sentences are kept in an `EnrichmentCache` at that path, and
+    only the sentences that are not found in it are enriched. The whole corpus is then read first, whether
+    or not the run is `fused`.
+
+    If a `SubtaskProfile` is given as `profile`, each subtask is run as one pass over the sentences and
+    measured, and the run is not `fused`, so that a pass covers the whole corpus where it can.
+    """
+    for warning in check_subtask_order(subtasks):
+        print(f"Warning: {warning}", file=sys.stderr)
+    # How many tokens each supersense normalization rule rewrote
+    rewrites = Counter()
+    if profile is not None:
+        fused = False
+
+    streaming = "-" in (conllulex_input_path, conllulex_output_path)
+    checkpoint = None
+    if checkpoint_every is not None or resume:
+        if streaming:
+            raise ValueError("Checkpoints can only be kept when reading from and writing to files")
+        if incremental_path is not None:
+            raise ValueError("Checkpoints cannot be kept in an incremental run")
+        checkpoint = Checkpoint(
+            conllulex_input_path,
+            conllulex_output_path,
+            subtasks,
+            subtask_options,
+            every=checkpoint_every or CHECKPOINT_EVERY,
+        )
+
+    try:
+        if incremental_path is not None:
+            cache = EnrichmentCache(incremental_path, subtasks, subtask_options)
+            try:
+                _enrich_incrementally(
+                    conllulex_input_path,
+                    conllulex_output_path,
+                    subtasks,
+                    jobs,
+                    subtask_options,
+                    cache,
+                    profile,
+                    rewrites,
+                )
+            finally:
+                cache.report()
+                cache.close()
+        elif jobs > 1 or fused or streaming or checkpoint is not None:
+            _enrich_in_chunks(
+                conllulex_input_path,
+                conllulex_output_path,
+                subtasks,
+                cache_dir,
+                jobs,
+                fused,
+                subtask_options,
+                checkpoint,
+                resume,
+                profile,
+                rewrites,
+            )
+        else:
+            _enrich_in_memory(
+                conllulex_input_path, conllulex_output_path, subtasks, cache_dir, subtask_options, profile, rewrites
+            )
+        _report_supersense_rewrites(rewrites)
+    finally:
+        _close_pipeline_resources()
+
+
+def _enrich_in_chunks(
+    conllulex_input_path,
+    conllulex_output_path,
+    subtasks,
+    cache_dir,
+    jobs,
+    fused,
+    subtask_options,
+    checkpoint,
+    resume,
+    profile,
+    rewrites,
+):
+    streaming = "-" in (conllulex_input_path, conllulex_output_path)
+    # Everything is read before anything is written unless the run is fused, or it has to be, since it reads
+    # from or writes to a pipe or keeps checkpoints. A fused run still has to read everything first if it
+    # would otherwise overwrite its input before reading it.
+    read_first = (
+        not streaming and checkpoint is None and (not fused or _same_file(conllulex_input_path, conllulex_output_path))
+    )
+    done = checkpoint.start(resume) if checkpoint is not None else 0
+    with ExitStack() as stack:
+        if jobs > 1:
+            if cache_dir is not None:
+                sentences = map(pack_tokenlist, iter_conllulex_file(conllulex_input_path, cache_dir=cache_dir))
+            else:
+                # Workers parse the raw sentences themselves
+                sentences = parse_sentences(stack.enter_context(open_file(conllulex_input_path)))
+            sentences = islice(sentences, done, None)
+            if read_first:
+                sentences = list(sentences)
+            pool = stack.enter_context(ProcessPoolExecutor(max_workers=jobs))
+            enriched = _iter_enriched_parallel(pool, sentences, subtasks, jobs, subtask_options, profile, rewrites)
+        else:
+            sentences = islice(iter_conllulex_file(conllulex_input_path, cache_dir=cache_dir), done, None)
+            enriched = _iter_enriched(sentences, subtasks, subtask_options, profile, rewrites)
+            if read_first:
+                enriched = list(enriched)
+
+        if checkpoint is not None:
+            # The output is only moved into place when it is complete, so it cannot overwrite the input early
+            checkpoint.write(enriched)
+            return
+        with open_file(conllulex_output_path, "w") as f:
+            for serialized in enriched:
+                f.write(serialized)
+
+
+def _same_file(input_path, output_path):
+    return os.path.exists(output_path) and os.path.samefile(input_path, output_path)
+
+
+def _enrich_in_memory(
+    conllulex_input_path, conllulex_output_path, subtasks, cache_dir, subtask_options, profile, rewrites
+):
+    # All sentences are parsed and kept, since batched subtasks get the whole corpus at once,
+    # but the input is read one sentence at a time rather than all at once.
+    sentences = list(iter_conllulex_file(conllulex_input_path, cache_dir=cache_dir))
+    _run_subtasks(sentences, subtasks, subtask_options, profile, rewrites)
+
+    # Written a sentence at a time, rather than joined into one string first
+    with open_file(conllulex_output_path, "w") as f:
+        for sentence in sentences:
+            f.write(serialize_conllulex_sentence(sentence))
+
+
+def _enrich_incrementally(
+    conllulex_input_path, conllulex_output_path, subtasks, jobs, subtask_options, cache, profile, rewrites
+):
+    # Unchanged sentences are taken from the cache without being parsed
+    with open_file(conllulex_input_path) as f:
+        raw_sentences = list(parse_sentences(f))
+    keys = [cache.key(raw_sentence) for raw_sentence in raw_sentences]
+    enriched = [None if key is None else cache.get(key) for key in keys]
+
+    misses = [i for i, serialized in enumerate(enriched) if serialized is None]
+    if misses:
+        changed = [raw_sentences[i] for i in misses]
+        changed = _enrich_raw_sentences(changed, subtasks, jobs, subtask_options, profile, rewrites)
+        for i, serialized in zip(misses, changed):
+            enriched[i] = serialized
+        cache.put_many([(keys[i], enriched[i]) for i in misses if keys[i] is not None])
+
+    with open_file(conllulex_output_path, "w") as f:
+        for serialized in enriched:
+            f.write(serialized)
+
+
+def _enrich_raw_sentences(raw_sentences, subtasks, jobs, subtask_options, profile=None, rewrites=None):
+    """Enrich a list of unparsed sentences as `main` would, and return them serialized."""
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            return list(
+                _iter_enriched_parallel(pool, raw_sentences, subtasks, jobs, subtask_options, profile, rewrites)
+            )
+    sentences = [parse_conllulex_sentence(raw_sentence.split("\n")) for raw_sentence in raw_sentences]
+    _run_subtasks(sentences, subtasks, subtask_options, profile, rewrites)
+    return [serialize_conllulex_sentence(s) for s in sentences]
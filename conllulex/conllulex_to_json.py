@@ -1,18 +1,29 @@
 import json
+import os
 import re
 import sys
-from collections import defaultdict
-from functools import partial
-from itertools import chain
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from functools import lru_cache, partial
+from itertools import chain, islice
 from pprint import pformat, pprint
 from typing import Iterable
 
-from conllu.serializer import serialize_field
-
 from conllulex.config import get_config
 from conllulex.lexcatter import get_lexcat_set, supersenses_for_lexcat
 from conllulex.mwe_render import render
-from conllulex.reading import get_conllulex_tokenlists
+from conllulex.reading import (
+    iter_conllulex_file,
+    open_file,
+    pack_tokenlist,
+    parse_conllulex_sentence,
+    parse_sentences,
+    serialize_token_field,
+    split_token_line,
+    strip_compression_suffix,
+    unpack_tokenlist,
+)
 from conllulex.supersenses import ancestors, makesslabel
 from conllulex.tagging import sent_tags
 
@@ -34,12 +45,133 @@ def _append_if_error(errors, sentence_id, test, explanation, token=None):
     return test
 
 
+_JSON_DECODER = json.JSONDecoder()
+_JSON_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def iter_json_array(f, chunk_size=1 << 16, prefix=""):
+    """
+    Yield the elements of the JSON array in an open file one at a time (e.g. the sentences of a
+    corpus written by `conllulex2json`), reading only as much of the file as is needed for the next one.
+    `prefix` is any text of the array that has already been read from `f`.
+    """
+    buf = prefix
+    pos = 0
+    eof = False
+
+    def next_char():
+        # Skip whitespace, reading more of the file if needed, and peek at the next character ("" at EOF)
+        nonlocal buf, pos, eof
+        while True:
+            pos = _JSON_WHITESPACE.match(buf, pos).end()
+            if pos < len(buf) or eof:
+                return buf[pos : pos + 1]
+            buf = f.read(chunk_size)
+            pos = 0
+            eof = buf == ""
+
+    if next_char() != "[":
+        raise ValueError("Expected a JSON array")
+    pos += 1
+    if next_char() == "]":
+        pos += 1
+    else:
+        while True:
+            next_char()
+            while True:
+                try:
+                    item, end = _JSON_DECODER.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    end = None
+                # A value ending exactly at the end of the buffer may continue in the next chunk
+                if end is not None and (end < len(buf) or eof):
+                    break
+                more = f.read(chunk_size)
+                eof = more == ""
+                buf = buf[pos:] + more
+                pos = 0
+            pos = end
+            yield item
+
+            c = next_char()
+            pos += 1
+            if c == "]":
+                break
+            if c != ",":
+                raise ValueError(f"Expected ',' or ']' after a JSON array element, found {c!r}")
+    if next_char() != "":
+        raise ValueError("Extra data after the JSON array")
+
+
+def write_json_array(items, f):
+    """
+    Write an iterable as a JSON array, one element at a time. The result is the same as that of
+    `f.write(json.dumps(list(items), indent=1))`.
+    """
+    first = True
+    for item in items:
+        f.write(_json_array_element(item, first))
+        first = False
+    f.write("[]" if first else "\n]")
+
+
+def _json_array_element(item, first):
+    # Elements of an indented array are one level deeper than they would be on their own. JSON strings
+    # cannot contain a literal newline, so every newline in the dump is one between lines.
+    return ("[\n " if first else ",\n ") + json.dumps(item, indent=1).replace("\n", "\n ")
+
+
+def json_line(item):
+    """`item` as compact JSON on a line of its own, as in the JSON Lines format."""
+    return json.dumps(item, separators=(",", ":")) + "\n"
+
+
+def _iter_json_lines(f, prefix):
+    for line in chain([prefix + f.readline()] if prefix else [], f):
+        if line.strip():
+            item = json.loads(line)
+            if isinstance(item, dict) and item.keys() == {"error"}:
+                raise ValueError(f"The corpus is incomplete: {item['error']}")
+            yield item
+
+
+def read_json_sentences(f):
+    """
+    Find out whether the corpus in an open file is one JSON array (the `json` format of `conllulex2json`)
+    or has one sentence per line (the `jsonl` format).
+
+    Returns: the format, "json" or "jsonl", and an iterator that reads the sentences one at a time.
+    """
+    c = f.read(1)
+    while c.isspace():
+        c = f.read(1)
+    if c == "[":
+        return "json", iter_json_array(f, prefix=c)
+    return "jsonl", _iter_json_lines(f, c)
+
+
+def _iter_json_sentences(input_path, ss_mapper, include_morph_head_deprel, include_misc, errors):
+    with open_file(input_path) as f:
+        _, sentences = read_json_sentences(f)
+        yield from _process_json_sentences(sentences, ss_mapper, include_morph_head_deprel, include_misc, errors)
+
+
 def _load_json(input_path, ss_mapper, include_morph_head_deprel, include_misc):
     errors = []
-    modified_sentences = []
+    modified_sentences = list(
+        _iter_json_sentences(input_path, ss_mapper, include_morph_head_deprel, include_misc, errors)
+    )
+    return modified_sentences, errors
+
+
+def _same_label(label):
+    """The default `ss_mapper`, which leaves supersense labels as they are."""
+    return label
 
-    with open(input_path, "r", encoding="utf-8") as f:
-        sentences = json.load(f)
+
+def _process_json_sentences(sentences, ss_mapper, include_morph_head_deprel, include_misc, errors):
     for sentence in sentences:
         for lex_expr in chain(sentence["swes"].values(), sentence["smwes"].values()):
             if lex_expr["ss"] is not None:
@@ -73,21 +205,23 @@ def _load_json(input_path, ss_mapper, include_morph_head_deprel, include_misc):
             for token in sentence["toks"]:
                 token.pop("misc", None)
 
-        modified_sentences.append(sentence)
-
-    return modified_sentences, errors
+        yield sentence
 
 
 def _store_conllulex(sentence, token_list, errors, store_conllulex_string):
-    sentence_lines = token_list.serialize()
     if store_conllulex_string == "none":
         return
-    elif store_conllulex_string == "full":
-        sentence["conllulex"] = token_list.serialize()
+    # The sentence's lines as they were read, if the reader kept them; otherwise they are re-serialized
+    source = getattr(token_list, "source", None)
+    if source is None:
+        source = token_list.serialize().rstrip("\n")
+    if store_conllulex_string == "full":
+        sentence["conllulex"] = source + "\n\n"
     elif store_conllulex_string == "toks":
-        sentence_lines = [
-            line for line in sentence_lines.split("\n") if line[0] != "#" and "." not in line.split("\t")[0]
-        ]
+        sentence_lines = []
+        for line in source.split("\n"):
+            if line.strip() and line[0] != "#" and "." not in split_token_line(line)[0]:
+                sentence_lines.append(line)
         sentence["conllulex"] = "\n".join(sentence_lines)
 
 
@@ -106,10 +240,10 @@ def _store_metadata(sentence, token_list, errors):
 
 
 def _store_morph_and_deps(token_dict, token, errors, is_ellipsis, is_supertoken, sent_id):
-    token_dict["feats"] = serialize_field(token["feats"])
+    token_dict["feats"] = serialize_token_field(token, "feats")
     token_dict["head"] = token["head"]
     token_dict["deprel"] = token["deprel"]
-    token_dict["edeps"] = serialize_field(token["deps"])
+    token_dict["edeps"] = serialize_token_field(token, "deps")
 
     if token["head"] == "_":
         _append_if_error(
@@ -131,7 +265,7 @@ def _store_morph_and_deps(token_dict, token, errors, is_ellipsis, is_supertoken,
         token_dict["deprel"] = None
 
 
-def _store_conllulex_columns(sentence, token_dict, token, errors, ss_mapper, corpus):
+def _store_conllulex_columns(sentence, token_dict, token, errors, ss_mapper, plan):
     sent_id = sentence["sent_id"]
     token_num = token_dict["#"]
 
@@ -181,8 +315,7 @@ def _store_conllulex_columns(sentence, token_dict, token, errors, ss_mapper, cor
             )
     else:
         token_dict["smwe"] = None
-        lang_config, _ = get_config(corpus)
-        if token["upos"] not in lang_config["mwe_lemma_exception_lexcat_list"]:
+        if token["upos"] not in plan.mwe_lemma_exceptions:
             _append_if_error(
                 errors,
                 sent_id,
@@ -248,22 +381,33 @@ def _store_conllulex_columns(sentence, token_dict, token, errors, ss_mapper, cor
             token=token,
         )
 
-    lextag = token["lextag"]
+    token_dict["lextag"] = _normalize_lextag(token["lextag"], ss_mapper)
+
+
+_SS_LABEL = re.compile(r"\b[a-z]\.[A-Za-z/-]+")
+_REPEATED_SS_LABEL = re.compile(r"\b([a-z]\.[A-Za-z/-]+)\|\1\b")
 
-    for m in re.finditer(r"\b[a-z]\.[A-Za-z/-]+", token["lextag"]):
-        lextag = lextag.replace(m.group(0), ss_mapper(m.group(0)))
-    for m in re.finditer(r"\b([a-z]\.[A-Za-z/-]+)\|\1\b", lextag):
+
+@lru_cache(maxsize=65536)
+def _normalize_lextag(lextag, ss_mapper):
+    """
+    Apply `ss_mapper` to the supersenses in a lextag. A corpus has few distinct lextags, so each is only
+    mapped once per `ss_mapper`, which is assumed to always map a label to the same result.
+    """
+    normalized = lextag
+    for m in _SS_LABEL.finditer(lextag):
+        normalized = normalized.replace(m.group(0), ss_mapper(m.group(0)))
+    for m in _REPEATED_SS_LABEL.finditer(normalized):
         # e.g. p.Locus|p.Locus due to abstraction of p.Goal|p.Locus
-        lextag = lextag.replace(m.group(0), m.group(1))  # simplify to p.Locus
-    token_dict["lextag"] = lextag
+        normalized = normalized.replace(m.group(0), m.group(1))  # simplify to p.Locus
+    return normalized
 
 
-def _validate_sentence_ids(corpus_config, sentences, errors):
+def _validate_sentence_ids(corpus_config, sent_ids, errors):
     """
     Sentences are requried to have `sent_id` equal to something like `...-01` where the last bit, conforming
     to regex /-\\d+/, indicates the number of the sentence within the document.
     """
-    sent_ids = [s.metadata["sent_id"] for s in sentences]
     doc_id = corpus_config.get("doc_id_fn", lambda x: x.rsplit("-", 1)[0])
     sent_num = corpus_config.get("sent_num_fn", lambda x: int(x.rsplit("-", 1)[1]))
     _append_if_error(
@@ -295,101 +439,266 @@ def _validate_sentence_ids(corpus_config, sentences, errors):
             )
 
 
-def _load_sentences(
+def _convert_token_list(
+    corpus,
+    token_list,
+    errors,
+    include_morph_deps,
+    include_misc,
+    store_conllulex_string,
+    ss_mapper,
+):
+    """
+    Convert a single sentence's `conllu.TokenList` into a sentence dict in the JSON format,
+    appending any problems found along the way to `errors`.
+    """
+    plan = validation_plan(corpus)
+    sent_id = token_list.metadata["sent_id"]
+    sentence = {
+        "sent_id": sent_id,
+    }
+    _store_metadata(sentence, token_list, errors)
+    sentence.update(
+        {
+            "toks": [],  # excludes ellipsis tokens, to make indexing convenient
+            "etoks": [],  # ellipsis tokens only
+            "swes": defaultdict(
+                lambda: {
+                    "lexlemma": None,
+                    "lexcat": None,
+                    "ss": None,
+                    "ss2": None,
+                    "toknums": [],
+                }
+            ),
+            "smwes": defaultdict(
+                lambda: {
+                    "lexlemma": None,
+                    "lexcat": None,
+                    "ss": None,
+                    "ss2": None,
+                    "toknums": [],
+                }
+            ),
+            "wmwes": defaultdict(lambda: {"lexlemma": None, "toknums": []}),
+        }
+    )
+    _store_conllulex(sentence, token_list, errors, store_conllulex_string)
+
+    for token in token_list:
+        token_dict = {}
+        is_ellipsis = isinstance(token["id"], Iterable) and len(token["id"]) == 3 and token["id"][1] == "."
+        is_supertoken = isinstance(token["id"], Iterable) and len(token["id"]) == 3 and token["id"][1] == "-"
+        if is_ellipsis or is_supertoken:
+            token_dict["#"] = (
+                token["id"][0],
+                token["id"][2],
+                "".join([str(part) for part in token["id"]]),
+            )
+        else:
+            token_dict["#"] = token["id"]
+        token_dict.update(
+            {
+                "word": token["form"],
+                "lemma": token["lemma"],
+                "upos": token["upos"],
+                "xpos": token["xpos"],
+            }
+        )
+
+        if include_morph_deps:
+            _store_morph_and_deps(token_dict, token, errors, is_ellipsis, is_supertoken, sent_id)
+
+        if include_misc:
+            token_dict["misc"] = serialize_token_field(token, "misc")
+
+        for nullable_column in ("xpos", "feats", "edeps", "misc"):
+            if token_dict[nullable_column] in ["_", None]:
+                token_dict[nullable_column] = None
+
+        if not is_ellipsis and not is_supertoken:
+            _store_conllulex_columns(sentence, token_dict, token, errors, ss_mapper, plan)
+            sentence["toks"].append(token_dict)
+        elif is_ellipsis:
+            sentence["etoks"].append(token_dict)
+
+    return sentence
+
+
+def _iter_sentences(
     corpus,
     input_path,
     include_morph_deps,
     include_misc,
     store_conllulex_string,
     ss_mapper,
+    errors,
+    cache_dir=None,
 ):
+    """Yield each sentence of the input in the JSON format as soon as it has been converted."""
     _, corpus_config = get_config(corpus)
 
+    if strip_compression_suffix(input_path).endswith((".json", ".jsonl")):
+        yield from _iter_json_sentences(input_path, ss_mapper, include_morph_deps, include_misc, errors)
+        return
+
+    # Sentences are converted as they are parsed, so only one sentence's worth of
+    # conllu.TokenList is alive at any time. Sentence IDs are checked once all are known.
+    sent_ids = []
+    keep_source = store_conllulex_string != "none"
+    for token_list in iter_conllulex_file(input_path, cache_dir=cache_dir, keep_source=keep_source):
+        sent_ids.append(token_list.metadata["sent_id"])
+        yield _convert_token_list(
+            corpus,
+            token_list,
+            errors,
+            include_morph_deps,
+            include_misc,
+            store_conllulex_string,
+            ss_mapper,
+        )
+    _validate_sentence_ids(corpus_config, sent_ids, errors)
+
+
+def _load_sentences(
+    corpus,
+    input_path,
+    include_morph_deps,
+    include_misc,
+    store_conllulex_string,
+    ss_mapper,
+    cache_dir=None,
+):
     errors = []
-    sentences = []
-    if input_path.endswith(".json"):
-        return _load_json(input_path, ss_mapper, include_morph_deps, include_misc)
+    sentences = list(
+        _iter_sentences(
+            corpus,
+            input_path,
+            include_morph_deps,
+            include_misc,
+            store_conllulex_string,
+            ss_mapper,
+            errors,
+            cache_dir=cache_dir,
+        )
+    )
+    return sentences, errors
 
-    token_lists = get_conllulex_tokenlists(input_path)
-    _validate_sentence_ids(corpus_config, token_lists, errors)
 
-    for token_list in token_lists:
-        sent_id = token_list.metadata["sent_id"]
-        sentence = {
-            "sent_id": sent_id,
-        }
-        _store_metadata(sentence, token_list, errors)
-        sentence.update(
-            {
-                "toks": [],  # excludes ellipsis tokens, to make indexing convenient
-                "etoks": [],  # ellipsis tokens only
-                "swes": defaultdict(
-                    lambda: {
-                        "lexlemma": None,
-                        "lexcat": None,
-                        "ss": None,
-                        "ss2": None,
-                        "toknums": [],
-                    }
-                ),
-                "smwes": defaultdict(
-                    lambda: {
-                        "lexlemma": None,
-                        "lexcat": None,
-                        "ss": None,
-                        "ss2": None,
-                        "toknums": [],
-                    }
-                ),
-                "wmwes": defaultdict(lambda: {"lexlemma": None, "toknums": []}),
-            }
+def _iter_validated_sentences(
+    corpus, sentences, validation_errors, validate_upos_lextag, validate_type, override_mwe_render
+):
+    for sentence in sentences:
+        _validate_sentences(
+            corpus, [sentence], validation_errors, validate_upos_lextag, validate_type, override_mwe_render
         )
-        _store_conllulex(sentence, token_list, errors, store_conllulex_string)
-
-        for token in token_list:
-            token_dict = {}
-            is_ellipsis = isinstance(token["id"], Iterable) and len(token["id"]) == 3 and token["id"][1] == "."
-            is_supertoken = isinstance(token["id"], Iterable) and len(token["id"]) == 3 and token["id"][1] == "-"
-            if is_ellipsis or is_supertoken:
-                token_dict["#"] = (
-                    token["id"][0],
-                    token["id"][2],
-                    "".join([str(part) for part in token["id"]]),
-                )
-            else:
-                token_dict["#"] = token["id"]
-            token_dict.update(
-                {
-                    "word": token["form"],
-                    "lemma": token["lemma"],
-                    "upos": token["upos"],
-                    "xpos": token["xpos"],
-                }
-            )
+        yield sentence
 
-            if include_morph_deps:
-                _store_morph_and_deps(token_dict, token, errors, is_ellipsis, is_supertoken, sent_id)
 
-            if include_misc:
-                token_dict["misc"] = serialize_field(token["misc"])
+# Number of sentences handed to a worker process at a time
+CHUNK_SIZE = 64
 
-            for nullable_column in ("xpos", "feats", "edeps", "misc"):
-                if token_dict[nullable_column] in ["_", None]:
-                    token_dict[nullable_column] = None
 
-            if not is_ellipsis and not is_supertoken:
-                _store_conllulex_columns(sentence, token_dict, token, errors, ss_mapper, corpus)
-                sentence["toks"].append(token_dict)
-            elif is_ellipsis:
-                sentence["etoks"].append(token_dict)
+def _iter_chunks(items, size):
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
 
-        sentences.append(sentence)
 
-    return sentences, errors
+def _convert_and_validate_chunk(corpus, chunk, conversion_options, validation_options):
+    """
+    Convert (unless they already are sentence dicts from a JSON input) and validate a chunk of sentences
+    in a worker process. Returns the sentences, their sentence IDs, and the conversion and validation
+    errors found in them.
+    """
+    conversion_errors = []
+    validation_errors = []
+    if conversion_options is None:
+        sentences = chunk
+    else:
+        sentences = []
+        for item in chunk:
+            if isinstance(item, str):
+                token_list = parse_conllulex_sentence(item.split("\n"))
+                token_list.source = item
+            else:
+                token_list = unpack_tokenlist(item)
+            sentences.append(_convert_token_list(corpus, token_list, conversion_errors, *conversion_options))
+    _validate_sentences(corpus, sentences, validation_errors, *validation_options)
+    for sentence in sentences:
+        # defaultdicts of lambdas cannot be pickled to send them back
+        for key in ("swes", "smwes", "wmwes"):
+            sentence[key] = dict(sentence[key])
+    return sentences, [sentence["sent_id"] for sentence in sentences], conversion_errors, validation_errors
+
+
+def _iter_sentences_in_parallel(
+    corpus,
+    input_path,
+    include_morph_deps,
+    include_misc,
+    store_conllulex_string,
+    ss_mapper,
+    validate_upos_lextag,
+    validate_type,
+    override_mwe_render,
+    conversion_errors,
+    validation_errors,
+    jobs,
+    cache_dir=None,
+):
+    """
+    Like `_iter_sentences`, with each sentence then validated by `_validate_sentences`, but chunks of sentences
+    are converted and validated by `jobs` worker processes. Sentences and errors come out in the same order
+    as when this is done in one process, so `ss_mapper` has to be picklable, e.g. a module-level function.
+    """
+    _, corpus_config = get_config(corpus)
+    validation_options = (validate_upos_lextag, validate_type, override_mwe_render)
+    sent_ids = []
+
+    def collect(result):
+        sentences, chunk_sent_ids, chunk_conversion_errors, chunk_validation_errors = result
+        sent_ids.extend(chunk_sent_ids)
+        conversion_errors.extend(chunk_conversion_errors)
+        validation_errors.extend(chunk_validation_errors)
+        return sentences
+
+    with ExitStack() as stack:
+        if strip_compression_suffix(input_path).endswith((".json", ".jsonl")):
+            # Loading a JSON corpus is little work next to validating it, so only the latter is parallelized
+            conversion_options = None
+            chunk_items = _iter_json_sentences(
+                input_path, ss_mapper, include_morph_deps, include_misc, conversion_errors
+            )
+        else:
+            conversion_options = (include_morph_deps, include_misc, store_conllulex_string, ss_mapper)
+            if cache_dir is not None:
+                chunk_items = map(pack_tokenlist, iter_conllulex_file(input_path, cache_dir=cache_dir))
+            else:
+                # Workers parse the raw sentences themselves
+                chunk_items = parse_sentences(stack.enter_context(open_file(input_path)))
+        pool = stack.enter_context(ProcessPoolExecutor(max_workers=jobs))
+
+        # Keep a bounded number of chunks in flight and hand back results in the order they were submitted
+        pending = deque()
+        for chunk in _iter_chunks(chunk_items, CHUNK_SIZE):
+            pending.append(
+                pool.submit(_convert_and_validate_chunk, corpus, chunk, conversion_options, validation_options)
+            )
+            if len(pending) >= 2 * jobs:
+                yield from collect(pending.popleft().result())
+        while pending:
+            yield from collect(pending.popleft().result())
+
+    if conversion_options is not None:
+        _validate_sentence_ids(corpus_config, sent_ids, conversion_errors)
 
 
 def _write_json(sents, output_path):
-    with open(output_path, "w", encoding="utf-8") as f:
+    with open_file(output_path, "w") as f:
         f.write(json.dumps(sents, indent=1))
 
 
@@ -401,15 +710,15 @@ def format_error(error):
     return s
 
 
-def _write_errors(errors):
-    print("Errors were found during validation:")
+def _write_errors(errors, file=sys.stdout):
+    print("Errors were found during validation:", file=file)
 
     errors = sorted(errors, key=lambda e: (e["explanation"], e["sentence_id"]))
     for i, error in enumerate(errors, start=1):
-        print(f"- Error {i}.")
-        print(format_error(error))
+        print(f"- Error {i}.", file=file)
+        print(format_error(error), file=file)
 
-    print(f"Found a total of {len(errors)} errors.")
+    print(f"Found a total of {len(errors)} errors.", file=file)
 
 
 def _mwe_lexlemma_valid(lang_config, sentence, smwe):
@@ -453,12 +762,88 @@ def _mwe_lexlemma_valid(lang_config, sentence, smwe):
     return correct, possible_lexlemmas, xformed_lexlemma
 
 
+class ValidationPlan:
+    """
+    The parts of a corpus's `LANG_CFG` and `CORPUS_CFG` entries that validation consults for every
+    expression, compiled into lookup tables. Answers that depend on an expression's labels are worked
+    out the first time they are needed and reused after that. Use `validation_plan` to get the plan
+    for a corpus, which is kept for the rest of the process.
+    """
+
+    def __init__(self, corpus):
+        self.lang_config, self.corpus_config = get_config(corpus)
+        self.language = self.corpus_config["language"]
+        self.lexcats = get_lexcat_set(self.language)
+        self.mwe_lemma_exceptions = self.lang_config["mwe_lemma_exception_lexcat_list"]
+        self.allowed_mismatches = self.lang_config["allowed_mismatched_upos_lexcat_pairs"]
+        self.lexcat_exceptions = self.lang_config["lexcat_exception_list"]
+
+        self._valid_supersenses = {}
+        self._mismatch_verdicts = {}
+        self._construal_errors = {}
+
+    def valid_supersenses(self, lexcat):
+        """The supersenses an expression with this lexcat may have in this corpus."""
+        valid_ss = self._valid_supersenses.get(lexcat)
+        if valid_ss is None:
+            annotated = self.corpus_config["supersense_annotated"]
+            if (
+                lexcat.startswith("V")
+                and "V" not in annotated
+                or lexcat == "N"
+                and "N" not in annotated
+                or lexcat in ["P", "PP"]
+                and "P" not in annotated
+            ):
+                valid_ss = set()
+            else:
+                valid_ss = supersenses_for_lexcat(lexcat, self.language)
+                if lexcat in ["P", "PP"] and "P" in annotated:
+                    valid_ss = valid_ss | self.lang_config["extra_prepositional_supersenses"]
+            self._valid_supersenses[lexcat] = valid_ss
+        return valid_ss
+
+    def mismatch_ok(self, xpos, upos, lemma, lexlemma, lexcat):
+        """Whether one of the `mismatched_lexcat_exception_checks` lets a SWE's lexcat differ from its upos."""
+        key = (xpos, upos, lemma, lexlemma, lexcat)
+        verdict = self._mismatch_verdicts.get(key)
+        if verdict is None:
+            fields = {"xpos": xpos, "upos": upos, "lemma": lemma, "lexlemma": lexlemma, "lexcat": lexcat}
+            verdict = any(check(fields) for check in self.lang_config["mismatched_lexcat_exception_checks"])
+            self._mismatch_verdicts[key] = verdict
+        return verdict
+
+    def construal_errors(self, ss, ss2):
+        """The explanations of what is wrong with the construal ss ~> ss2 of two different adposition supersenses."""
+        key = (ss, ss2)
+        errors = self._construal_errors.get(key)
+        if errors is None:
+            errors = []
+            if ss2 in self.lang_config["banned_functions"]:
+                errors.append(f"{ss2} should never be function")
+            ss_ancestors, ss2_ancestors = ancestors(ss), ancestors(ss2)
+            # there are just a few permissible combinations where one is the ancestor of the other
+            if (ss, ss2) not in self.lang_config["permitted_ancestor_combos"]:
+                if ss in ss2_ancestors:
+                    errors.append(f"unexpected construal: {ss} ~> {ss2}")
+                if ss2 in ss_ancestors:
+                    errors.append(f"unexpected construal: {ss} ~> {ss2}")
+            errors = self._construal_errors[key] = tuple(errors)
+        return errors
+
+
+@lru_cache(maxsize=None)
+def validation_plan(corpus):
+    return ValidationPlan(corpus)
+
+
 def _validate_sentences(corpus, sentences, errors, validate_upos_lextag, validate_type, override_mwe_render):
     lexcat_tbd_count = 0
 
-    lang_config, corpus_config = get_config(corpus)
-    language = corpus_config["language"]
-    all_lexcats = get_lexcat_set(language)
+    plan = validation_plan(corpus)
+    lang_config = plan.lang_config
+    language = plan.language
+    all_lexcats = plan.lexcats
 
     for sentence in sentences:
         sent_id = sentence["sent_id"]
@@ -480,7 +865,7 @@ def _validate_sentences(corpus, sentences, errors, validate_upos_lextag, validat
 
             if len(lex_expr["toknums"]) > 1:
                 # check against the form directly for hindi MWE expressions only
-                if lex_expr["lexcat"] not in lang_config["mwe_lemma_exception_lexcat_list"]:
+                if lex_expr["lexcat"] not in plan.mwe_lemma_exceptions:
                     assert_(
                         lex_expr["lexlemma"]
                         == " ".join(
@@ -492,7 +877,7 @@ def _validate_sentences(corpus, sentences, errors, validate_upos_lextag, validat
                         token=lex_expr,
                     )
             else:
-                if lex_expr["lexcat"] not in lang_config["mwe_lemma_exception_lexcat_list"]:
+                if lex_expr["lexcat"] not in plan.mwe_lemma_exceptions:
                     assert_(
                         lex_expr["lexlemma"] == " ".join(sentence["toks"][i - 1]["lemma"] for i in lex_expr["toknums"]),
                         f"MWE lemma is incorrect: {lex_expr} vs. {sentence['toks'][lex_expr['toknums'][0] - 1]}",
@@ -503,21 +888,9 @@ def _validate_sentences(corpus, sentences, errors, validate_upos_lextag, validat
                 lexcat_tbd_count += 1
 
             # Determine the set of supersenses available to this expression
-            if (
-                lexcat.startswith("V")
-                and "V" not in corpus_config["supersense_annotated"]
-                or lexcat == "N"
-                and "N" not in corpus_config["supersense_annotated"]
-                or lexcat in ["P", "PP"]
-                and "P" not in corpus_config["supersense_annotated"]
-            ):
-                valid_ss = set()
-            else:
-                valid_ss = supersenses_for_lexcat(lexcat, language)
-                if lexcat in ["P", "PP"] and "P" in corpus_config["supersense_annotated"]:
-                    valid_ss = valid_ss | lang_config["extra_prepositional_supersenses"]
+            valid_ss = plan.valid_supersenses(lexcat)
 
-            if "V" in corpus_config["supersense_annotated"] and lexcat == "V":
+            if "V" in plan.corpus_config["supersense_annotated"] and lexcat == "V":
                 assert_(
                     len(lex_expr["toknums"]) == 1,
                     f'Verbal MWE "{lex_expr["lexlemma"]}" lexcat must be subtyped (V.VID, etc., not V)',
@@ -530,7 +903,7 @@ def _validate_sentences(corpus, sentences, errors, validate_upos_lextag, validat
                 elif ss is None:
                     assert_(False, f"Missing supersense annotation in lexical entry: {lex_expr}", token=lex_expr)
                 elif ss not in valid_ss:
-                    if lexcat not in lang_config["lexcat_exception_list"]:
+                    if lexcat not in plan.lexcat_exceptions:
                         assert_(False, f"Invalid supersense(s) in lexical entry: {lex_expr}", token=lex_expr)
 
                 elif language not in ["la"] and (lexcat in ("N", "V") or lexcat.startswith("V.")) and ss2 is not None:
@@ -544,18 +917,10 @@ def _validate_sentences(corpus, sentences, errors, validate_upos_lextag, validat
                         token=lex_expr,
                     )
                     if ss != ss2:
-                        assert_(
-                            ss2 not in lang_config["banned_functions"],
-                            f"{ss2} should never be function",
-                            token=lex_expr,
-                        )
-                        ss_ancestors, ss2_ancestors = ancestors(ss), ancestors(ss2)
-                        # there are just a few permissible combinations where one is the ancestor of the other
-                        if (ss, ss2) not in lang_config["permitted_ancestor_combos"]:
-                            assert_(ss not in ss2_ancestors, f"unexpected construal: {ss} ~> {ss2}", token=lex_expr)
-                            assert_(ss2 not in ss_ancestors, f"unexpected construal: {ss} ~> {ss2}", token=lex_expr)
+                        for explanation in plan.construal_errors(ss, ss2):
+                            assert_(False, explanation, token=lex_expr)
             else:
-                if lexcat not in lang_config["lexcat_exception_list"]:
+                if lexcat not in plan.lexcat_exceptions:
                     assert_(
                         ss is None and ss2 is None and lexcat not in ("P", "INF.P", "PP", "POSS", "PRON.POSS"),
                         f"Invalid supersense(s) in lexical entry.",
@@ -572,25 +937,9 @@ def _validate_sentences(corpus, sentences, errors, validate_upos_lextag, validat
             if lexcat not in all_lexcats:
                 assert_(not validate_type, f"invalid lexcat {lexcat} for single-word expression '{tok['word']}'")
                 continue
-            if (
-                validate_upos_lextag
-                and upos != lexcat
-                and (upos, lexcat) not in lang_config["allowed_mismatched_upos_lexcat_pairs"]
-            ):
-                mismatchOK = False
-                for f in lang_config["mismatched_lexcat_exception_checks"]:
-                    mismatchOK = mismatchOK or f(
-                        {
-                            "xpos": xpos,
-                            "upos": upos,
-                            "lemma": tok["lemma"],
-                            "lexlemma": swe["lexlemma"],
-                            "lexcat": lexcat,
-                        }
-                    )
-
+            if validate_upos_lextag and upos != lexcat and (upos, lexcat) not in plan.allowed_mismatches:
                 assert_(
-                    mismatchOK,
+                    plan.mismatch_ok(xpos, upos, tok["lemma"], swe["lexlemma"], lexcat),
                     f"single-word expression '{tok['word']}' has lexcat {lexcat}, "
                     f"which is incompatible with its upos {upos}",
                 )
@@ -664,6 +1013,109 @@ def _validate_sentences(corpus, sentences, errors, validate_upos_lextag, validat
                 print(f"MWE string mismatch{caveat}: {s}, {sentence['mwe']}, {sentence['sent_id']}", file=sys.stderr)
 
 
+def _partial_path(path):
+    # Where output is written until it is known to be valid; keeps any compression suffix
+    root = strip_compression_suffix(path)
+    return root + ".partial" + path[len(root) :]
+
+
+def _stream_conllulex_to_json(
+    corpus,
+    input_path,
+    output_path,
+    output_format,
+    include_morph_deps,
+    include_misc,
+    validate_upos_lextag,
+    validate_type,
+    store_conllulex_string,
+    override_mwe_render,
+    ss_mapper,
+    force_write,
+    cache_dir,
+    jobs,
+):
+    # Conversion and validation errors are kept apart so that, once concatenated, they are in the
+    # same order as when the whole corpus is converted before it is validated
+    conversion_errors = []
+    validation_errors = []
+    if jobs > 1:
+        sentences = _iter_sentences_in_parallel(
+            corpus,
+            input_path,
+            include_morph_deps,
+            include_misc,
+            store_conllulex_string,
+            ss_mapper,
+            validate_upos_lextag,
+            validate_type,
+            override_mwe_render,
+            conversion_errors,
+            validation_errors,
+            jobs,
+            cache_dir=cache_dir,
+        )
+    else:
+        sentences = _iter_sentences(
+            corpus,
+            input_path,
+            include_morph_deps,
+            include_misc,
+            store_conllulex_string,
+            ss_mapper,
+            conversion_errors,
+            cache_dir=cache_dir,
+        )
+        sentences = _iter_validated_sentences(
+            corpus, sentences, validation_errors, validate_upos_lextag, validate_type, override_mwe_render
+        )
+
+    # A file is written under another name and only moved into place if it is complete
+    target_path = output_path if output_path == "-" else _partial_path(output_path)
+    written = 0
+    try:
+        with open_file(target_path, "w") as f:
+            for sentence in sentences:
+                if force_write or not (conversion_errors or validation_errors):
+                    if output_format == "jsonl":
+                        f.write(json_line(sentence))
+                    else:
+                        f.write(_json_array_element(sentence, written == 0))
+                    written += 1
+            errors = conversion_errors + validation_errors
+            if output_format == "json" and (force_write or not errors):
+                f.write("\n]" if written else "[]")
+            elif output_path == "-" and errors and not force_write:
+                # Lines read up to an error would pass for a whole corpus, so the stream ends in an error
+                # record, which `read_json_sentences` refuses
+                f.write(json_line({"error": f"Errors were found. Output was stopped after {written} sentences."}))
+    except BaseException:
+        # Including KeyboardInterrupt: a partial file is never left behind
+        if output_path != "-" and os.path.exists(target_path):
+            os.remove(target_path)
+        raise
+
+    if output_path != "-":
+        if force_write or not errors:
+            os.replace(target_path, output_path)
+        else:
+            os.remove(target_path)
+        if errors:
+            _write_errors(errors)
+            if force_write:
+                print("`ignore_validation_errors` was set to true, writing output anyway")
+                print(f"Wrote {written} sentences to {output_path}")
+            else:
+                print("Errors were found. No output was written.")
+    elif errors:
+        _write_errors(errors, file=sys.stderr)
+        if force_write:
+            print("`ignore_validation_errors` was set to true, wrote output anyway", file=sys.stderr)
+        else:
+            print(f"Errors were found. Output was stopped after {written} sentences.", file=sys.stderr)
+            sys.exit(1)
+
+
 def convert_conllulex_to_json(
     input_path,
     output_path,
@@ -674,17 +1126,30 @@ def convert_conllulex_to_json(
     validate_type=True,
     store_conllulex_string="none",
     override_mwe_render=False,
-    ss_mapper=lambda x: x,
+    ss_mapper=_same_label,
     force_write=False,
+    cache_dir=None,
+    output_format="json",
+    jobs=1,
 ):
     """
     Read an input conllulex file, convert it into the JSON format, and write the result
     out to the output path. If there are validation errors, fail before writing anything
     and print errors out to stdout, like a compiler.
 
+    If the output path is "-", sentences are instead written to stdout as soon as they have been
+    converted and validated, and messages go to stderr. Writing stops at the first error, and the
+    JSON array is left unterminated if any errors were found (or, with `output_format="jsonl"`, a final
+    `{"error": ...}` line is written), so that a downstream reader fails rather than silently consuming a
+    partial corpus. The process then exits with status 1.
+
+    With `output_format="jsonl"`, each sentence is written as compact JSON on a line of its own as soon
+    as it has been converted and validated, so the corpus is never held in memory. A file is written
+    under a temporary name and replaced with the output path once the whole corpus is found to be valid.
+
     Args:
-        input_path: path to a conllulex file OR a json file
-        output_path: path the output json file should be written to
+        input_path: path to a conllulex file OR a json or jsonl file, or "-" to read conllulex from stdin
+        output_path: path the output json file should be written to, or "-" for stdout
         corpus: The corpus contained in the conllulex file. Needed for language-specific config.
         include_morph_deps: Whether to include CoNLL-U MORPH, HEAD, DEPREL, and EDEPS columns, if available,
             in the output json. FORM, UPOS, XPOS and LEMMA are always included.
@@ -698,20 +1163,66 @@ def convert_conllulex_to_json(
         ss_mapper: A function to apply to supersense labels to replace them in the returned data structure. Applies to
             all supersense labels (nouns, verbs, prepositions). Not applied if the supersense slot is empty.
         force_write: when True, produce output regardless of errors
+        cache_dir: if given, a directory in which parsed conllulex files are cached, so that converting an
+            unchanged file again skips parsing. See `conllulex.reading.get_conllulex_tokenlists`.
+        output_format: "json" for a single JSON array, or "jsonl" for one sentence per line (JSON Lines)
+        jobs: the number of processes to convert and validate sentences in. With more than one, `ss_mapper`
+            has to be picklable, e.g. a module-level function rather than a lambda.
 
     Returns:
         Nothing
     """
-    sentences, errors = _load_sentences(
-        corpus,
-        input_path,
-        include_morph_deps,
-        include_misc,
-        store_conllulex_string,
-        ss_mapper,
-    )
+    if output_path == "-" or output_format == "jsonl":
+        _stream_conllulex_to_json(
+            corpus,
+            input_path,
+            output_path,
+            output_format,
+            include_morph_deps,
+            include_misc,
+            validate_upos_lextag,
+            validate_type,
+            store_conllulex_string,
+            override_mwe_render,
+            ss_mapper,
+            force_write,
+            cache_dir,
+            jobs,
+        )
+        return
 
-    _validate_sentences(corpus, sentences, errors, validate_upos_lextag, validate_type, override_mwe_render)
+    if jobs > 1:
+        conversion_errors = []
+        validation_errors = []
+        sentences = list(
+            _iter_sentences_in_parallel(
+                corpus,
+                input_path,
+                include_morph_deps,
+                include_misc,
+                store_conllulex_string,
+                ss_mapper,
+                validate_upos_lextag,
+                validate_type,
+                override_mwe_render,
+                conversion_errors,
+                validation_errors,
+                jobs,
+                cache_dir=cache_dir,
+            )
+        )
+        errors = conversion_errors + validation_errors
+    else:
+        sentences, errors = _load_sentences(
+            corpus,
+            input_path,
+            include_morph_deps,
+            include_misc,
+            store_conllulex_string,
+            ss_mapper,
+            cache_dir=cache_dir,
+        )
+        _validate_sentences(corpus, sentences, errors, validate_upos_lextag, validate_type, override_mwe_render)
 
     if len(errors) == 0:
         _write_json(sentences, output_path)
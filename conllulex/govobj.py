@@ -80,6 +80,9 @@ import sys
 from collections import Counter
 from itertools import chain
 
+from conllulex.conllulex_to_json import json_line, read_json_sentences, write_json_array
+from conllulex.reading import open_file
+
 
 def enhance(sent):
     """
@@ -297,11 +300,12 @@ def findgovobj(pexpr, sent):
     # print(sent['mwe'], (gtok['word'], plemma, otok['word']), config)
 
 
-def govobj_enhance(input_path, output_path, edeps=True):
-    with open(input_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    for sent in data:
+def govobj_sentences(sentences, edeps=True):
+    """
+    Add governor/object information to each sentence dict of an iterable (e.g. a generator
+    producing STREUSLE JSON sentences one at a time), yielding each sentence once it is done.
+    """
+    for sent in sentences:
         if edeps:
             enhance(sent)  # apply Enhanced Dependencies instead of superficial conj relations for coordination
         for lexe in chain(sent["swes"].values(), sent["smwes"].values()):
@@ -311,7 +315,36 @@ def govobj_enhance(input_path, output_path, edeps=True):
             deenhance(
                 sent
             )  # now that we've extracted prepositional/possessive gov & obj, revert to Basic Dependencies in the output
+        yield sent
 
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=1)
-        f.write("\n")
+
+def govobj_enhance(input_path, output_path, edeps=True):
+    """
+    Add governor/object information to a corpus in the JSON format. The output is in the same format
+    as the input: one JSON array, or JSON Lines.
+    """
+    if "-" in (input_path, output_path):
+        # Reading from or writing to a pipe: enhance and write out one sentence at a time. (Not done
+        # for regular files, which would be clobbered if the input is also the output.)
+        with open_file(input_path) as f, open_file(output_path, "w") as out:
+            json_format, sentences = read_json_sentences(f)
+            sentences = govobj_sentences(sentences, edeps)
+            if json_format == "jsonl":
+                out.writelines(json_line(sent) for sent in sentences)
+            else:
+                write_json_array(sentences, out)
+                out.write("\n")
+        return
+
+    with open_file(input_path) as f:
+        json_format, sentences = read_json_sentences(f)
+        data = list(sentences)
+
+    data = list(govobj_sentences(data, edeps))
+
+    with open_file(output_path, "w") as f:
+        if json_format == "jsonl":
+            f.writelines(json_line(sent) for sent in data)
+        else:
+            json.dump(data, f, indent=1)
+            f.write("\n")
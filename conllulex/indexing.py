@@ -0,0 +1,194 @@
+"""
+Random access to the sentences of a .conllulex file. A sidecar index records the byte
+offset and length of every sentence, and the file is memory-mapped so that fetching a
+sentence only requires parsing that sentence's lines.
+"""
+import json
+import mmap
+import os
+
+from conllu.parser import parse_comment_line
+
+from conllulex.config import CORPUS_CFG
+from conllulex.reading import is_compressed, parse_conllulex_sentence
+
+INDEX_SUFFIX = ".idx"
+INDEX_VERSION = 1
+
+
+def get_index_path(conllulex_path):
+    return conllulex_path + INDEX_SUFFIX
+
+
+def build_index(conllulex_path, corpus):
+    """
+    Scan a .conllulex file and record where each of its sentences begins and ends.
+
+    Args:
+        conllulex_path: a filepath to a conllulex file
+        corpus: the corpus contained in the file. Its `doc_id_fn`, if configured, is used to
+            find the document each sentence belongs to.
+
+    Returns: A JSON-serializable dict holding the size and mtime of the file when it was indexed,
+    a list of `[sent_id, byte_offset, byte_length]` for every sentence in file order, and a dict
+    mapping each document ID to the `[start, stop)` ranges of sentence positions it occupies.
+    """
+    doc_id_fn = CORPUS_CFG[corpus].get("doc_id_fn", lambda x: x.rsplit("-", 1)[0])
+    stat = os.stat(conllulex_path)
+
+    sentences = []
+    with open(conllulex_path, "rb") as f:
+        offset = 0
+        start = None
+        end = None
+        sent_id = None
+        for line in f:
+            if line.strip() == b"":
+                if start is not None:
+                    sentences.append([sent_id, start, end - start])
+                    start = None
+                    sent_id = None
+            else:
+                if start is None:
+                    start = offset
+                if line.startswith(b"#"):
+                    for key, value in parse_comment_line(line.decode("utf-8")):
+                        if key == "sent_id":
+                            sent_id = value
+                end = offset + len(line)
+            offset += len(line)
+        if start is not None:
+            sentences.append([sent_id, start, end - start])
+
+    docs = {}
+    for i, (sent_id, _, _) in enumerate(sentences):
+        if sent_id is None:
+            continue
+        ranges = docs.setdefault(doc_id_fn(sent_id), [])
+        if ranges and ranges[-1][1] == i:
+            ranges[-1][1] = i + 1
+        else:
+            ranges.append([i, i + 1])
+
+    return {
+        "version": INDEX_VERSION,
+        "corpus": corpus,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sentences": sentences,
+        "docs": docs,
+    }
+
+
+def _index_is_current(index, conllulex_path, corpus):
+    stat = os.stat(conllulex_path)
+    return (
+        index.get("version") == INDEX_VERSION
+        and index.get("corpus") == corpus
+        and index.get("size") == stat.st_size
+        and index.get("mtime_ns") == stat.st_mtime_ns
+    )
+
+
+def load_index(conllulex_path, corpus, index_path=None):
+    """
+    Read the sidecar index of a .conllulex file, (re)building it if it is missing or if the
+    file's size or mtime no longer match the ones recorded in it.
+    """
+    index_path = index_path or get_index_path(conllulex_path)
+    if os.path.exists(index_path):
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if _index_is_current(index, conllulex_path, corpus):
+                return index
+        except ValueError:
+            pass
+
+    index = build_index(conllulex_path, corpus)
+    try:
+        with open(index_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+    except OSError:
+        # A read-only location only costs us the reuse of the index
+        pass
+    return index
+
+
+class IndexedConllulex:
+    """
+    A memory-mapped .conllulex file whose sentences can be looked up by `sent_id`, or
+    grouped by document, without parsing the rest of the file.
+
+    >>> with IndexedConllulex("streusle.conllulex", corpus="streusle") as corpus:
+    ...     sentence = corpus["reviews-001325-0001"]
+    """
+
+    def __init__(self, conllulex_path, corpus="pastrie", index_path=None):
+        if is_compressed(conllulex_path):
+            raise ValueError(f"{conllulex_path} is compressed and cannot be memory-mapped; decompress it first")
+        self.conllulex_path = conllulex_path
+        self.index = load_index(conllulex_path, corpus, index_path=index_path)
+        self._positions = {}
+        for i, (sent_id, _, _) in enumerate(self.index["sentences"]):
+            if sent_id is not None:
+                self._positions.setdefault(sent_id, i)
+
+        self._file = open(conllulex_path, "rb")
+        # mmap refuses to map empty files
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.index["size"] > 0 else b""
+
+    def close(self):
+        if isinstance(self._mmap, mmap.mmap):
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self.index["sentences"])
+
+    def __contains__(self, sent_id):
+        return sent_id in self._positions
+
+    def __getitem__(self, sent_id):
+        return self.parse_sentence(self.position(sent_id))
+
+    def position(self, sent_id):
+        try:
+            return self._positions[sent_id]
+        except KeyError:
+            raise KeyError(f"Sentence with ID {sent_id} not found in {self.conllulex_path}")
+
+    def sent_ids(self):
+        return [sent_id for sent_id, _, _ in self.index["sentences"]]
+
+    def doc_ids(self):
+        return list(self.index["docs"].keys())
+
+    def raw_sentence(self, position):
+        """The lines of the sentence at the given position in the file, exactly as they appear in it."""
+        _, offset, length = self.index["sentences"][position]
+        return self._mmap[offset : offset + length].decode("utf-8")
+
+    def raw(self, sent_id):
+        return self.raw_sentence(self.position(sent_id))
+
+    def parse_sentence(self, position):
+        """Parse the sentence at the given position in the file into a `conllu.TokenList`."""
+        return parse_conllulex_sentence(self.raw_sentence(position).split("\n"))
+
+    def doc_positions(self, doc_id):
+        try:
+            ranges = self.index["docs"][doc_id]
+        except KeyError:
+            raise KeyError(f"Document with ID {doc_id} not found in {self.conllulex_path}")
+        return [i for start, stop in ranges for i in range(start, stop)]
+
+    def doc(self, doc_id):
+        """All sentences belonging to a document, in file order, as `conllu.TokenList`s."""
+        return [self.parse_sentence(i) for i in self.doc_positions(doc_id)]
@@ -7,6 +7,9 @@ from conllulex import conllulex_enrichment
 from conllulex.config import CORPUS_CFG
 from conllulex.conllulex_to_json import convert_conllulex_to_json
 from conllulex.govobj import govobj_enhance
+from conllulex.indexing import IndexedConllulex
+from conllulex.profiling import SubtaskProfile
+from conllulex.reading import open_file
 
 
 @click.group()
@@ -40,7 +43,7 @@ def glam2conllulex(
 ):
     import json
 
-    with open(input_filepath, "r") as f:
+    with open_file(input_filepath) as f:
         d = json.load(f)
     doc_name = d["name"].replace(" ", "-").lower()
     text_layer = _layer_by_name(d["text-layers"], text_layer_name)
@@ -90,7 +93,7 @@ def glam2conllulex(
             outlines.append("\t".join(cols))
         outlines.append("")
 
-    with open(output_filepath, "w") as f:
+    with open_file(output_filepath, "w") as f:
         f.write(("\n".join(outlines)) + "\n")
 
 
@@ -115,12 +118,127 @@ def glam2conllulex(
     f"Possible values are: {', '.join(conllulex_enrichment.SUBTASKS.keys())}. See "
     f"conllulex_richment.py for more details.",
 )
-def enrich(input_path, output_path, corpus, subtasks):
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="A directory in which to cache parsed conllulex files, keyed by their contents, so that "
+    "an unchanged input is not parsed again on later runs. Off by default.",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=1,
+    help="The number of worker processes to enrich sentences with. Subtasks that hold a model in memory "
+    "(run_through_pipeline) still run in the main process. The output is the same for any number of jobs.",
+)
+@click.option(
+    "--fused/--no-fused",
+    default=False,
+    help="Enrich and write out the corpus a chunk of sentences at a time, instead of reading all of it first, "
+    "so that memory use stays flat. The output is the same, with or without --jobs. Always done when reading "
+    "from or writing to -.",
+)
+@click.option(
+    "--pipeline-batch-size",
+    type=click.IntRange(min=1),
+    default=conllulex_enrichment.PIPELINE_BATCH_SIZE,
+    show_default=True,
+    help="The number of sentences run_through_pipeline sends to the parser per call.",
+)
+@click.option(
+    "--pipeline-cache",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="An SQLite file in which run_through_pipeline keeps its parses. Sentences whose tokens were"
+    " already parsed by the same model are read from it instead of being parsed again.",
+)
+@click.option(
+    "--parses",
+    type=click.Path(),
+    default=None,
+    help="A CoNLL-U file with existing parses of the corpus. run_through_pipeline then copies lemma, upos,"
+    " xpos, feats, head and deprel from its sentences, matched by sent_id, instead of running Stanza.",
+)
+@click.option(
+    "--checkpoint-every",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Save a checkpoint every N sentences, so that an interrupted run can be picked up again with --resume."
+    f" Implies --fused. [default with --resume: {conllulex_enrichment.CHECKPOINT_EVERY}]",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    help="Continue from the last checkpoint saved for OUTPUT_PATH instead of starting over.",
+)
+@click.option(
+    "--incremental",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="An SQLite file in which to keep every enriched sentence. On later runs with the same subtasks, only"
+    " sentences that are new or were edited since are enriched again, and the rest are taken from the file.",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Measure every subtask (wall and CPU time, peak memory, sentences and tokens visited, and cells"
+    " changed) and print a table of the results to stderr at the end. Each subtask is run as one pass over"
+    " the sentences, and --fused is ignored.",
+)
+@click.option(
+    "--profile-json",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Write the --profile report to this JSON file instead of printing it. Implies --profile.",
+)
+def enrich(
+    input_path,
+    output_path,
+    corpus,
+    subtasks,
+    cache_dir,
+    jobs,
+    fused,
+    pipeline_batch_size,
+    pipeline_cache,
+    parses,
+    checkpoint_every,
+    resume,
+    incremental,
+    profile,
+    profile_json,
+):
+    if (checkpoint_every is not None or resume) and "-" in (input_path, output_path):
+        raise click.UsageError("--checkpoint-every and --resume need both INPUT_PATH and OUTPUT_PATH to be files")
+    if (checkpoint_every is not None or resume) and incremental is not None:
+        raise click.UsageError("--incremental cannot be combined with --checkpoint-every or --resume")
     if subtasks is None:
         subtasks = CORPUS_CFG[corpus]["enrichment_subtasks"]
     else:
         subtasks = [s.strip() for s in subtasks.split(",")]
-    conllulex_enrichment.main(input_path, output_path, subtasks)
+    subtask_options = {
+        "run_through_pipeline": {"batch_size": pipeline_batch_size, "cache_path": pipeline_cache, "parses_path": parses}
+    }
+    subtask_profile = SubtaskProfile(subtasks) if profile or profile_json is not None else None
+    conllulex_enrichment.main(
+        input_path,
+        output_path,
+        subtasks,
+        cache_dir=cache_dir,
+        jobs=jobs,
+        fused=fused,
+        subtask_options=subtask_options,
+        checkpoint_every=checkpoint_every,
+        resume=resume,
+        incremental_path=incremental,
+        profile=subtask_profile,
+    )
+    if profile_json is not None:
+        subtask_profile.write_json(profile_json)
+    elif subtask_profile is not None:
+        click.echo(subtask_profile.format_table(), err=True)
 
 
 @click.command(
@@ -177,6 +295,29 @@ def enrich(input_path, output_path, corpus, subtasks):
     help="By default, the conversion will halt if any errors are detected. If this option is set to true, "
     "print validation errors as warnings and produce output anyway.",
 )
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="A directory in which to cache parsed conllulex files, keyed by their contents, so that "
+    "an unchanged input is not parsed again on later runs. Off by default.",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(["json", "jsonl"]),
+    default="json",
+    help="json writes the corpus as one JSON array. jsonl writes each sentence as compact JSON on a line "
+    "of its own (JSON Lines), as soon as it has been validated, so the corpus is never held in memory.",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=1,
+    help="The number of worker processes to convert and validate sentences with. The output and the errors "
+    "reported are the same for any number of jobs.",
+)
 def conllulex2json(
     input_path,
     output_path,
@@ -188,6 +329,9 @@ def conllulex2json(
     store_conllulex_string,
     override_mwe_render,
     force_write,
+    cache_dir,
+    output_format,
+    jobs,
 ):
     convert_conllulex_to_json(
         input_path=input_path,
@@ -200,6 +344,9 @@ def conllulex2json(
         store_conllulex_string=store_conllulex_string,
         override_mwe_render=override_mwe_render,
         force_write=force_write,
+        cache_dir=cache_dir,
+        output_format=output_format,
+        jobs=jobs,
     )
 
 
@@ -211,10 +358,45 @@ def govobj(input_path, output_path, edeps):
     govobj_enhance(input_path, output_path, edeps)
 
 
+@click.command(
+    help="Print the sentences with the given IDs from a conllulex file, exactly as they appear in it. "
+    "A byte-offset index is kept next to the file (as <input_path>.idx) so that only the requested "
+    "sentences are read; it is rebuilt whenever the file changes."
+)
+@click.argument("input_path")
+@click.argument("ids", nargs=-1, required=True)
+@click.option(
+    "--corpus",
+    "-c",
+    type=click.Choice(CORPUS_CFG.keys(), case_sensitive=False),
+    help="The corpus contained in the conllulex file. Determines how document IDs are derived from sentence IDs.",
+    default="pastrie",
+)
+@click.option(
+    "--doc/--no-doc",
+    default=False,
+    help="Treat the given IDs as document IDs and print every sentence of each document.",
+)
+def show(input_path, ids, corpus, doc):
+    try:
+        indexed = IndexedConllulex(input_path, corpus=corpus)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    with indexed:
+        for id_ in ids:
+            try:
+                positions = indexed.doc_positions(id_) if doc else [indexed.position(id_)]
+            except KeyError as e:
+                raise click.ClickException(e.args[0])
+            for position in positions:
+                click.echo(indexed.raw_sentence(position))
+
+
 top.add_command(glam2conllulex)
 top.add_command(enrich)
 top.add_command(conllulex2json)
 top.add_command(govobj)
+top.add_command(show)
 
 if __name__ == "__main__":
     top()
@@ -0,0 +1,142 @@
+"""
+Per-subtask measurements of an enrichment run: how long each subtask took, how much memory it
+allocated, how many sentences and tokens it was given, and how many of their cells it changed.
+"""
+import json
+import time
+import tracemalloc
+from itertools import zip_longest
+
+from conllu.serializer import serialize_field
+
+from conllulex.reading import ColumnarToken
+
+STAT_NAMES = ["wall_time", "cpu_time", "peak_memory_delta", "sentences", "tokens", "cells_changed"]
+
+
+def subtask_label(subtask):
+    """A subtask as it appears in a subtask list, e.g. `add_lexcat` or `run_through_pipeline(en)`."""
+    if isinstance(subtask, str):
+        return subtask
+    return f"{subtask[0]}({', '.join(str(arg) for arg in subtask[1:])})"
+
+
+def _token_state(token):
+    # A copy of the token's columns, taken without decoding a `LazyToken`'s pending columns, along with
+    # the raw strings it keeps for them. Subtasks replace column values rather than changing them in place.
+    if isinstance(token, ColumnarToken):
+        return {field: column[token.position] for field, column in token.corpus.columns.items()}, None
+    return dict(dict.items(token)), getattr(token, "_raw", None)
+
+
+def _same_cell(old, new):
+    # A column may have been decoded since it was read, while its value stayed the same
+    return old == new or (isinstance(old, str) != isinstance(new, str) and serialize_field(old) == serialize_field(new))
+
+
+def _changed_cells(old, new):
+    (old_cells, old_raw), (new_cells, new_raw) = old, new
+    if old_raw is new_raw:
+        if old_cells == new_cells:
+            return 0
+        return sum(1 for k in old_cells.keys() | new_cells.keys() if old_cells.get(k) != new_cells.get(k))
+    old_cells, new_cells = {**(old_raw or {}), **old_cells}, {**(new_raw or {}), **new_cells}
+    return sum(1 for k in old_cells.keys() | new_cells.keys() if not _same_cell(old_cells.get(k), new_cells.get(k)))
+
+
+def _snapshot(sentence):
+    return dict(sentence.metadata), [_token_state(t) for t in sentence]
+
+
+def _count_changed_cells(before, sentence):
+    metadata, tokens = before
+    changed = sum(1 for k in metadata.keys() | sentence.metadata.keys() if metadata.get(k) != sentence.metadata.get(k))
+    for old, new in zip_longest(tokens, map(_token_state, sentence)):
+        if old is None or new is None:
+            # A token was added or removed
+            changed += len((old or new)[0])
+        else:
+            changed += _changed_cells(old, new)
+    return changed
+
+
+class SubtaskProfile:
+    """
+    Statistics for every subtask of a run, keyed by `subtask_label`. Subtasks that appear more
+    than once in the list are added up.
+
+    Memory is measured with `tracemalloc`, which slows everything down, so times are only
+    comparable with each other and not with those of a run without profiling. In a run with
+    several worker processes, they are added up over all workers. `peak_memory_delta` is the most
+    memory allocated by a single call of the subtask at any one time; the enrichment runs one call
+    per subtask over all the sentences (or a chunk of them) when profiling.
+    """
+
+    def __init__(self, subtasks=()):
+        self.stats = {}
+        for subtask in subtasks:
+            self._stats_for(subtask_label(subtask))
+
+    def _stats_for(self, label):
+        return self.stats.setdefault(label, dict.fromkeys(STAT_NAMES, 0))
+
+    def run(self, subtask, function, sentences, args, kwargs):
+        """Call `function(sentences, *args, **kwargs)`, record its statistics under `subtask`, and return its result."""
+        before = [_snapshot(sentence) for sentence in sentences]
+
+        # Memory is only traced while the subtask runs, unless something else was already tracing it
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        try:
+            tracemalloc.reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+            start_wall = time.perf_counter()
+            start_cpu = time.process_time()
+            result = function(sentences, *args, **kwargs)
+            wall_time = time.perf_counter() - start_wall
+            cpu_time = time.process_time() - start_cpu
+            peak_memory_delta = tracemalloc.get_traced_memory()[1] - start_memory
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+
+        stats = self._stats_for(subtask_label(subtask))
+        stats["wall_time"] += wall_time
+        stats["cpu_time"] += cpu_time
+        stats["peak_memory_delta"] = max(stats["peak_memory_delta"], peak_memory_delta)
+        stats["sentences"] += len(sentences)
+        stats["tokens"] += sum(len(sentence) for sentence in sentences)
+        stats["cells_changed"] += sum(_count_changed_cells(b, s) for b, s in zip(before, sentences))
+        return result
+
+    def merge(self, other):
+        """Add the statistics of another profile, e.g. one made in a worker process, to this one."""
+        for label, other_stats in other.stats.items():
+            stats = self._stats_for(label)
+            for name in STAT_NAMES:
+                if name == "peak_memory_delta":
+                    stats[name] = max(stats[name], other_stats[name])
+                else:
+                    stats[name] += other_stats[name]
+
+    def to_json(self):
+        return [dict(subtask=label, **stats) for label, stats in self.stats.items()]
+
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_json(), f, indent=2)
+
+    def format_table(self):
+        width = max([len("subtask")] + [len(label) for label in self.stats])
+        lines = [
+            f"{'subtask':<{width}}  {'wall (s)':>9}  {'cpu (s)':>9}  {'peak mem (MiB)':>14}  "
+            f"{'sentences':>9}  {'tokens':>9}  {'cells changed':>13}"
+        ]
+        for label, stats in self.stats.items():
+            lines.append(
+                f"{label:<{width}}  {stats['wall_time']:>9.3f}  {stats['cpu_time']:>9.3f}  "
+                f"{stats['peak_memory_delta'] / 2**20:>14.2f}  {stats['sentences']:>9}  "
+                f"{stats['tokens']:>9}  {stats['cells_changed']:>13}"
+            )
+        return "\n".join(lines)
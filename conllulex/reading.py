@@ -1,35 +1,773 @@
 """
-Rely on the standard conllu package to parse conllulex.
+Parse conllulex into the data structures of the standard conllu package. The 19-column
+layout is fixed, so sentences are parsed by a specialized reader rather than by `conllu.parse`,
+but the resulting `TokenList`s are the same. Likewise, `serialize_conllulex_sentence` writes
+them back out faster than `TokenList.serialize`, with the same result.
 """
+import bz2
+import gzip
+import hashlib
+import json
+import lzma
+import os
+import re
+import sys
+import tempfile
+import time
+from array import array
+from collections.abc import MutableMapping, Sequence
+from functools import lru_cache
+
 import conllu
+from conllu.exceptions import ParseException
+from conllu.parser import (
+    parse_comment_line,
+    parse_dict_value,
+    parse_id_value,
+    parse_int_value,
+    parse_nullable_value,
+    parse_paired_list_value,
+    parse_sentences,
+)
+from conllu.serializer import serialize_field
+
+CONLLULEX_FIELDS = tuple(
+    list(conllu.parser.DEFAULT_FIELDS)
+    + [
+        "smwe",  # 10
+        "lexcat",  # 11
+        "lexlemma",  # 12
+        "ss",  # 13
+        "ss2",  # 14
+        "wmwe",  # 15
+        "wcat",  # 16
+        "wlemma",  # 17
+        "lextag",  # 18
+    ]
+)
+
+# Columns whose values are only decoded from their raw string when they are first accessed
+LAZY_FIELD_PARSERS = {
+    "feats": parse_dict_value,
+    "deps": parse_paired_list_value,
+    "misc": parse_dict_value,
+}
+
+_COLUMN_SEPARATOR = re.compile(r"\t| {2,}")
+
+# Bump whenever a change to the reader alters what it produces, so that cached parses are not reused
+PARSER_VERSION = 1
+DEFAULT_CACHE_SIZE = 1024**3  # bytes
+_CACHE_SUFFIX = ".corpus"
+_TMP_SUFFIX = ".tmp"
+# Seconds after which a temporary file is taken to have been left behind by a writer that died
+_STALE_TMP_AGE = 3600
+
+_COMPRESSED_OPENERS = {".gz": gzip.open, ".xz": lzma.open, ".bz2": bz2.open}
+
+
+class LazyToken(conllu.Token):
+    """
+    A `conllu.Token` whose FEATS, DEPS, and MISC columns are held as raw strings until one
+    of them is accessed, at which point all pending columns are decoded exactly as `conllu.parse`
+    would have decoded them. Apart from when the decoding happens, it behaves like a `conllu.Token`:
+    key order, equality, iteration, `dict(token)` and pickling all see the decoded values.
+    """
+
+    __slots__ = ("_raw",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._raw = None
+
+    def _decode(self):
+        raw = self._raw
+        if raw is None:
+            return
+        self._raw = None
+        # Decoded columns are spliced back into their original position among the columns
+        current = list(dict.items(self))
+        present = dict(current)
+        dict.clear(self)
+        for field in CONLLULEX_FIELDS:
+            if field in present:
+                dict.__setitem__(self, field, present.pop(field))
+            elif field in raw:
+                dict.__setitem__(self, field, LAZY_FIELD_PARSERS[field](raw[field]))
+        for key, value in current:
+            if key in present:
+                dict.__setitem__(self, key, value)
+
+    def serialized(self, key):
+        """
+        Return the CoNLL-U string form of a column, i.e. `serialize_field(token[key])`.
+        A column that has not been decoded yet is returned as-is from the input whenever
+        decoding and re-serializing it would reproduce it exactly.
+        """
+        raw = self._raw
+        if raw is not None and key in raw and not dict.__contains__(self, key):
+            value = raw[key]
+            if _round_trips(key, value):
+                return value
+        return serialize_field(self[key])
+
+    def __missing__(self, key):
+        raw = self._raw
+        if raw is not None and key in raw:
+            self._decode()
+            return dict.__getitem__(self, key)
+        return super().__missing__(key)
+
+    def get(self, key, default=None):
+        self._decode()
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        raw = self._raw
+        return dict.__contains__(self, key) or (raw is not None and key in raw)
+
+    def __len__(self):
+        self._decode()
+        return dict.__len__(self)
+
+    def __iter__(self):
+        self._decode()
+        return dict.__iter__(self)
+
+    def __delitem__(self, key):
+        self._decode()
+        dict.__delitem__(self, key)
+
+    def __eq__(self, other):
+        self._decode()
+        if isinstance(other, LazyToken):
+            other._decode()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        self._decode()
+        return dict.__repr__(self)
+
+    def __reduce_ex__(self, protocol):
+        self._decode()
+        return super().__reduce_ex__(protocol)
+
+    def keys(self):
+        self._decode()
+        return dict.keys(self)
+
+    def values(self):
+        self._decode()
+        return dict.values(self)
+
+    def items(self):
+        self._decode()
+        return dict.items(self)
+
+    def copy(self):
+        self._decode()
+        return dict.copy(self)
+
+    def pop(self, *args):
+        self._decode()
+        return dict.pop(self, *args)
+
+    def popitem(self):
+        self._decode()
+        return dict.popitem(self)
+
+    def setdefault(self, key, default=None):
+        self._decode()
+        return dict.setdefault(self, key, default)
+
+
+@lru_cache(maxsize=65536)
+def _round_trips(key, raw):
+    return serialize_field(LAZY_FIELD_PARSERS[key](raw)) == raw
+
+
+def serialize_token_field(token, key):
+    """`serialize_field(token[key])`, without decoding the column first if `token` is a `LazyToken`."""
+    if isinstance(token, LazyToken):
+        return token.serialized(key)
+    return serialize_field(token[key])
+
 
+def _parse_id(value):
+    if value.isascii() and value.isdigit() and (value[0] != "0" or value == "0"):
+        return int(value)
+    return parse_id_value(value)
 
-def get_conllulex_tokenlists(conllulex_path):
+
+def _parse_head(value):
+    if value.isascii() and value.isdigit() and (value[0] != "0" or value == "0"):
+        return int(value)
+    return parse_int_value(value)
+
+
+_EAGER_FIELD_PARSERS = {
+    "id": _parse_id,
+    "xpos": parse_nullable_value,
+    "head": _parse_head,
+}
+_ID, _XPOS, _FEATS, _HEAD, _DEPS, _MISC = (
+    CONLLULEX_FIELDS.index(f) for f in ("id", "xpos", "feats", "head", "deps", "misc")
+)
+_N_FIELDS = len(CONLLULEX_FIELDS)
+_CONLLULEX_COLUMNS = CONLLULEX_FIELDS[10:]
+
+
+def _parse_field(field, parser, value):
+    try:
+        return parser(value)
+    except ParseException as e:
+        raise ParseException("Failed parsing field '{}': ".format(field) + str(e))
+
+
+def split_token_line(line):
+    """Split a token line into its columns, which are separated by a tab or by two or more spaces."""
+    return _COLUMN_SEPARATOR.split(line) if "  " in line else line.split("\t")
+
+
+def _parse_token_line(line):
+    line_split = split_token_line(line)
+    if len(line_split) == 1:
+        raise ParseException("Invalid line format, line must contain either tabs or two spaces.")
+
+    token = LazyToken()
+    if len(line_split) >= _N_FIELDS:
+        # The usual case: all 19 columns are present, so their positions are known
+        c = line_split
+        id_, head = c[_ID], c[_HEAD]
+        id_ = int(id_) if id_.isascii() and id_.isdecimal() and id_[0] != "0" else _parse_field("id", _parse_id, id_)
+        head = (
+            int(head)
+            if head.isascii() and head.isdecimal() and head[0] != "0"
+            else _parse_field("head", _parse_head, head)
+        )
+        dict.update(
+            token,
+            (
+                ("id", id_),
+                ("form", c[1]),
+                ("lemma", c[2]),
+                ("upos", c[3]),
+                ("xpos", c[_XPOS] if c[_XPOS] not in ("", "_") else None),
+                ("head", head),
+                ("deprel", c[7]),
+            ),
+        )
+        dict.update(token, zip(_CONLLULEX_COLUMNS, c[10:_N_FIELDS]))
+        token._raw = {"feats": c[_FEATS], "deps": c[_DEPS], "misc": c[_MISC]}
+        return token
+
+    raw = {}
+    for field, value in zip(CONLLULEX_FIELDS, line_split):
+        if field in LAZY_FIELD_PARSERS:
+            raw[field] = value
+            continue
+        parser = _EAGER_FIELD_PARSERS.get(field)
+        if parser is not None:
+            value = _parse_field(field, parser, value)
+        dict.__setitem__(token, field, value)
+    if raw:
+        token._raw = raw
+    return token
+
+
+def parse_conllulex_sentence(lines):
+    """
+    Parse the lines of a single sentence into a `conllu.TokenList` of `LazyToken`s.
+
+    Args:
+        lines: an iterable of the sentence's lines, metadata included. Blank lines are skipped.
+
+    Returns: the same `conllu.TokenList` that `conllu.parse` would produce for the sentence.
+    """
+    tokens = []
+    metadata = conllu.Metadata()
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line[0] == "#":
+            for key, value in parse_comment_line(line):
+                metadata[key] = value
+        else:
+            tokens.append(_parse_token_line(line))
+    return conllu.TokenList(tokens, metadata, default_fields=CONLLULEX_FIELDS)
+
+
+_EAGER_FIELDS = tuple(field for field in CONLLULEX_FIELDS if field not in LAZY_FIELD_PARSERS)
+
+
+def _serialize_token(token):
+    if isinstance(token, LazyToken) and token._raw is not None:
+        # The FEATS, DEPS and MISC columns are written from the input, if they have not been touched
+        if tuple(dict.keys(token)) == _EAGER_FIELDS and len(token._raw) == 3:
+            columns = [value if value.__class__ is str else serialize_field(value) for value in dict.values(token)]
+            columns.insert(_FEATS, token.serialized("feats"))
+            columns.insert(_DEPS, token.serialized("deps"))
+            columns.insert(_MISC, token.serialized("misc"))
+            return "\t".join(columns)
+    elif tuple(dict.keys(token)) == CONLLULEX_FIELDS:
+        return "\t".join(value if value.__class__ is str else serialize_field(value) for value in dict.values(token))
+    # Tokens with missing or extra columns
+    return "\t".join(serialize_field(value) for value in token.values())
+
+
+def serialize_conllulex_sentence(token_list):
+    """
+    Serialize a sentence with 19-column tokens, e.g. one from `parse_conllulex_sentence`.
+
+    Returns: the same string as `token_list.serialize()`, but without decoding the columns of
+    `LazyToken`s or going through `serialize_field` for the many columns that are plain strings.
+    """
+    lines = [f"# {key} = {value}" if value else f"# {key}" for key, value in token_list.metadata.items()]
+    lines.extend(_serialize_token(token) for token in token_list)
+    return "\n".join(lines) + "\n\n"
+
+
+def iter_conllulex_tokenlists(conllulex_file, keep_source=False):
+    """
+    Lazily parse a 19-column .conllulex file, one sentence at a time.
+
+    Args:
+        conllulex_file: an open, readable text file handle positioned at the start of a sentence
+        keep_source: if true, each `conllu.TokenList` keeps the text it was parsed from as its `source`
+            attribute: the sentence's lines exactly as they are in the file, without the blank line after them.
+            It is the string the sentence was parsed from, so keeping it costs no copy.
+
+    Returns: A generator of `conllu.TokenList`, one for each sentence. Only the lines of
+    the sentence currently being parsed are held in memory.
+
+    """
+    for sentence in parse_sentences(conllulex_file):
+        token_list = parse_conllulex_sentence(sentence.split("\n"))
+        if keep_source:
+            token_list.source = sentence
+        yield token_list
+
+
+def strip_compression_suffix(path):
+    """Drop a trailing .gz, .xz or .bz2 from a path, e.g. to find out the format of `corpus.json.gz`."""
+    root, ext = os.path.splitext(path)
+    return root if ext in _COMPRESSED_OPENERS else path
+
+
+def is_compressed(path):
+    return strip_compression_suffix(path) != path
+
+
+def open_file(path, mode="r"):
+    """
+    Open a file as UTF-8 text (or as bytes, if `mode` contains "b"). Files ending in .gz, .xz or
+    .bz2 are (de)compressed on the fly, and "-" stands for stdin or stdout, depending on `mode`.
+    """
+    if path == "-":
+        stream = sys.stdin if "r" in mode else sys.stdout
+        stream.flush()
+        # Closing the returned file must leave stdin/stdout open
+        if "b" in mode:
+            return open(stream.fileno(), mode, closefd=False)
+        return open(stream.fileno(), mode, encoding="utf-8", closefd=False)
+    opener = _COMPRESSED_OPENERS.get(os.path.splitext(path)[1], open)
+    if "b" in mode:
+        return opener(path, mode)
+    if "t" not in mode:
+        mode += "t"
+    return opener(path, mode, encoding="utf-8")
+
+
+def pack_tokenlist(token_list):
+    """
+    Return a picklable form of a `conllu.TokenList`, e.g. to hand it to another process: a pickled
+    `conllu.TokenList` cannot be unpickled. `unpack_tokenlist` turns it back into a `conllu.TokenList`.
+    """
+    return list(token_list), token_list.metadata, token_list.default_fields
+
+
+def unpack_tokenlist(packed):
+    tokens, metadata, default_fields = packed
+    return conllu.TokenList(tokens, metadata, default_fields=default_fields)
+
+
+def get_conllulex_tokenlists(conllulex_path, cache_dir=None, cache_size=DEFAULT_CACHE_SIZE):
     """
     Parse a 19-column .conllulex file.
 
     Args:
-        conllulex_path: a filepath to a conllulex file
+        conllulex_path: a filepath to a conllulex file, optionally compressed (.gz, .xz or .bz2), or "-" for stdin
+        cache_dir: if given, a directory for caching parsed files across calls and processes. Parses
+            are keyed by the file's content hash and `PARSER_VERSION`, so an unchanged file is loaded
+            from the cache instead of being parsed again.
+        cache_size: the total size in bytes the cache directory may grow to before the least recently
+            used parses are evicted.
 
     Returns: A list of `conllu.TokenList` for each sentence.
     `TokenList` is an iterable, and every token is a dictionary keyed by the name
     of its column, lowercased.
 
     """
-    fields = tuple(
-        list(conllu.parser.DEFAULT_FIELDS)
-        + [
-            "smwe",  # 10
-            "lexcat",  # 11
-            "lexlemma",  # 12
-            "ss",  # 13
-            "ss2",  # 14
-            "wmwe",  # 15
-            "wcat",  # 16
-            "wlemma",  # 17
-            "lextag",  # 18
-        ]
-    )
-
-    with open(conllulex_path, "r", encoding="utf-8") as f:
-        return conllu.parse(f.read(), fields=fields)
+    if cache_dir is not None and conllulex_path != "-":
+        return _get_cached_tokenlists(conllulex_path, cache_dir, cache_size)
+    with open_file(conllulex_path) as f:
+        return conllu.SentenceList(iter_conllulex_tokenlists(f))
+
+
+def iter_conllulex_file(conllulex_path, cache_dir=None, keep_source=False):
+    """
+    Like `iter_conllulex_tokenlists`, but opens the file itself. If `cache_dir` is given, the
+    sentences come from (and go to) the parse cache of `get_conllulex_tokenlists` instead, unless
+    the file is stdin ("-"), which is always parsed as it is read. Sentences from the cache have
+    no `source`, even with `keep_source`.
+    """
+    if cache_dir is not None and conllulex_path != "-":
+        yield from get_conllulex_tokenlists(conllulex_path, cache_dir=cache_dir)
+        return
+    with open_file(conllulex_path) as f:
+        yield from iter_conllulex_tokenlists(f, keep_source=keep_source)
+
+
+def _cache_key(conllulex_path):
+    digest = hashlib.sha256()
+    with open(conllulex_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return f"{digest.hexdigest()}-v{PARSER_VERSION}"
+
+
+def _get_cached_tokenlists(conllulex_path, cache_dir, cache_size):
+    entry_path = os.path.join(cache_dir, _cache_key(conllulex_path) + _CACHE_SUFFIX)
+    try:
+        with open(entry_path, "rb") as f:
+            corpus = ColumnarCorpus.load(f)
+    except FileNotFoundError:
+        pass
+    except (EOFError, KeyError, TypeError, ValueError):
+        # A corrupt or incompatible entry is simply replaced
+        pass
+    else:
+        os.utime(entry_path)  # mark as recently used
+        return corpus.to_tokenlists()
+
+    with open_file(conllulex_path) as f:
+        token_lists = conllu.SentenceList(iter_conllulex_tokenlists(f))
+
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=_TMP_SUFFIX)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            ColumnarCorpus.from_tokenlists(token_lists).dump(f)
+        # mkstemp makes the file readable by its owner only, which would keep others from sharing the cache
+        os.chmod(tmp_path, 0o666 & ~_umask())
+        os.replace(tmp_path, entry_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    _evict_cache_entries(cache_dir, cache_size)
+    return token_lists
+
+
+def _umask():
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+def _evict_cache_entries(cache_dir, cache_size):
+    """
+    Delete the least recently used cache entries until the cache fits in `cache_size` bytes, along with any
+    temporary files left behind by runs that were interrupted while writing an entry.
+    """
+    entries = []
+    now = time.time()
+    for name in os.listdir(cache_dir):
+        is_tmp = name.endswith(_TMP_SUFFIX)
+        if not (is_tmp or name.endswith(_CACHE_SUFFIX)):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+            # A temporary file that is still recent may be an entry that another run is writing
+            if is_tmp and now - stat.st_mtime > _STALE_TMP_AGE:
+                os.unlink(path)
+        except FileNotFoundError:
+            continue
+        if not is_tmp:
+            entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= cache_size:
+            break
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+class ColumnarCorpus(Sequence):
+    """
+    A whole corpus stored column by column rather than token by token. Each of the 19 columns is an
+    `array` of integer codes into that column's vocabulary of interned CoNLL-U strings, and sentence
+    boundaries are kept as token offsets. Repetitive columns like UPOS or LEXCAT thus cost 4 bytes
+    per token, and a scan over one column touches only that column's array.
+
+    Indexing or iterating yields `ColumnarSentence` views, which quack like `conllu.TokenList`
+    (and whose tokens quack like `conllu.Token`) closely enough for the enrichment subtasks and
+    validators to read and write them. Values are decoded the same way the conllulex reader decodes
+    them, and values written through a view are stored in their serialized form, so reading them back
+    gives what re-parsing the serialized sentence would. Decoded values are shared between tokens
+    with the same string and must not be modified in place.
+    """
+
+    # Code 0 of every column stands for a column that is missing from a (short) token line
+    ABSENT = 0
+
+    def __init__(self):
+        self.columns = {field: array("I") for field in CONLLULEX_FIELDS}
+        self.vocabs = {field: [None] for field in CONLLULEX_FIELDS}
+        self.sentence_offsets = array("I", [0])
+        self.metadata = []
+        self._init_caches()
+
+    def _init_caches(self):
+        self._codes = {field: {value: code for code, value in enumerate(vocab)} for field, vocab in self.vocabs.items()}
+        self._decoded = {field: {} for field in CONLLULEX_FIELDS}
+
+    def __getstate__(self):
+        # The reverse vocabularies and decoding memos are rebuilt on demand
+        return {"columns": self.columns, "vocabs": self.vocabs, "offsets": self.sentence_offsets, "meta": self.metadata}
+
+    def __setstate__(self, state):
+        self.columns = state["columns"]
+        self.vocabs = state["vocabs"]
+        self.sentence_offsets = state["offsets"]
+        self.metadata = state["meta"]
+        self._init_caches()
+
+    @classmethod
+    def from_tokenlists(cls, token_lists):
+        corpus = cls()
+        for token_list in token_lists:
+            corpus.append(token_list)
+        return corpus
+
+    @classmethod
+    def from_file(cls, conllulex_path):
+        with open_file(conllulex_path) as f:
+            return cls.from_tokenlists(iter_conllulex_tokenlists(f))
+
+    # The first line of a file written by `dump`
+    _DUMP_MAGIC = b"conllulex-columns 1\n"
+
+    def dump(self, f):
+        """
+        Write the corpus to a binary file in a data-only format that `load` reads back: a header line,
+        a line of JSON holding the vocabularies, metadata and array lengths, and then the raw bytes of the
+        sentence offsets and of every column. Unlike a pickle, loading it cannot run any code.
+        """
+        header = {
+            "byteorder": sys.byteorder,
+            "itemsize": self.sentence_offsets.itemsize,
+            "n_sentences": len(self),
+            "n_tokens": self.n_tokens,
+            "vocabs": {field: vocab[1:] for field, vocab in self.vocabs.items()},
+            "metadata": [list(metadata.items()) for metadata in self.metadata],
+        }
+        f.write(self._DUMP_MAGIC)
+        f.write(json.dumps(header).encode("utf-8") + b"\n")
+        self.sentence_offsets.tofile(f)
+        for field in CONLLULEX_FIELDS:
+            self.columns[field].tofile(f)
+
+    @classmethod
+    def load(cls, f):
+        """Read a corpus written by `dump`. Raises ValueError or EOFError if the file is not a valid dump."""
+        if f.readline() != cls._DUMP_MAGIC:
+            raise ValueError("Not a ColumnarCorpus dump")
+        header = json.loads(f.readline())
+        corpus = cls()
+        if header["byteorder"] != sys.byteorder or header["itemsize"] != corpus.sentence_offsets.itemsize:
+            raise ValueError("ColumnarCorpus dump made on a platform with another integer layout")
+        corpus.vocabs = {field: [None] + list(header["vocabs"][field]) for field in CONLLULEX_FIELDS}
+        corpus.metadata = [conllu.Metadata(items) for items in header["metadata"]]
+        corpus.sentence_offsets = array("I")
+        corpus.sentence_offsets.fromfile(f, header["n_sentences"] + 1)
+        for field in CONLLULEX_FIELDS:
+            corpus.columns[field].fromfile(f, header["n_tokens"])
+        # Everything must fit together, so that a damaged or forged file cannot make lookups fail later
+        offsets = corpus.sentence_offsets
+        if (
+            len(corpus.metadata) != header["n_sentences"]
+            or offsets[0] != 0
+            or offsets[-1] != header["n_tokens"]
+            or any(start > stop for start, stop in zip(offsets, offsets[1:]))
+            or any(
+                len(corpus.columns[field]) and max(corpus.columns[field]) >= len(corpus.vocabs[field])
+                for field in CONLLULEX_FIELDS
+            )
+            or not all(isinstance(value, str) for vocab in corpus.vocabs.values() for value in vocab[1:])
+        ):
+            raise ValueError("Inconsistent ColumnarCorpus dump")
+        corpus._init_caches()
+        return corpus
+
+    def intern(self, field, value):
+        """Return the code of a CoNLL-U string in a column's vocabulary, adding it if it is new."""
+        codes = self._codes[field]
+        code = codes.get(value)
+        if code is None:
+            vocab = self.vocabs[field]
+            code = codes[value] = len(vocab)
+            vocab.append(value)
+        return code
+
+    def code(self, field, value):
+        """Return the code of a CoNLL-U string in a column's vocabulary, or None if it never occurs."""
+        return self._codes[field].get(value)
+
+    def decode(self, field, code):
+        """The value of a column's code, as it would appear on a parsed `conllu.Token`."""
+        decoded = self._decoded[field]
+        try:
+            return decoded[code]
+        except KeyError:
+            parser = _EAGER_FIELD_PARSERS.get(field) or LAZY_FIELD_PARSERS.get(field)
+            value = self.vocabs[field][code]
+            value = decoded[code] = parser(value) if parser is not None else value
+            return value
+
+    def append(self, token_list):
+        """Add a sentence (a `conllu.TokenList`, or anything iterable over token mappings) to the end."""
+        for token in token_list:
+            extra = set(token.keys()) - set(CONLLULEX_FIELDS)
+            if extra:
+                raise ValueError(f"Columns {sorted(extra)} are not conllulex columns")
+            for field in CONLLULEX_FIELDS:
+                if field in token:
+                    code = self.intern(field, serialize_token_field(token, field))
+                else:
+                    code = self.ABSENT
+                self.columns[field].append(code)
+        self.sentence_offsets.append(len(self.columns["id"]))
+        self.metadata.append(conllu.Metadata(getattr(token_list, "metadata", {})))
+
+    def __len__(self):
+        return len(self.sentence_offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("sentence index out of range")
+        return ColumnarSentence(self, i)
+
+    @property
+    def n_tokens(self):
+        return self.sentence_offsets[-1]
+
+    def to_tokenlists(self):
+        return conllu.SentenceList([sentence.to_tokenlist() for sentence in self])
+
+
+class ColumnarSentence(Sequence):
+    """A view of one sentence of a `ColumnarCorpus`. See `ColumnarCorpus` for details."""
+
+    # _sentence_index is where the enrichment subtasks keep the view's SentenceIndex
+    __slots__ = ("corpus", "index", "start", "stop", "_sentence_index")
+
+    def __init__(self, corpus, index):
+        self.corpus = corpus
+        self.index = index
+        self.start = corpus.sentence_offsets[index]
+        self.stop = corpus.sentence_offsets[index + 1]
+
+    @property
+    def metadata(self):
+        return self.corpus.metadata[self.index]
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("token index out of range")
+        return ColumnarToken(self.corpus, self.start + i)
+
+    def column(self, field):
+        """The decoded values of one column for every token in the sentence."""
+        corpus = self.corpus
+        decode = corpus.decode
+        return [decode(field, code) for code in corpus.columns[field][self.start : self.stop]]
+
+    def to_tokenlist(self):
+        tokens = []
+        for position in range(self.start, self.stop):
+            token = LazyToken()
+            raw = {}
+            for field in CONLLULEX_FIELDS:
+                code = self.corpus.columns[field][position]
+                if code == ColumnarCorpus.ABSENT:
+                    continue
+                if field in LAZY_FIELD_PARSERS:
+                    raw[field] = self.corpus.vocabs[field][code]
+                else:
+                    dict.__setitem__(token, field, self.corpus.decode(field, code))
+            if raw:
+                token._raw = raw
+            tokens.append(token)
+        return conllu.TokenList(tokens, conllu.Metadata(self.metadata), default_fields=CONLLULEX_FIELDS)
+
+    def serialize(self):
+        return self.to_tokenlist().serialize()
+
+
+class ColumnarToken(MutableMapping):
+    """A view of one token of a `ColumnarCorpus`. See `ColumnarCorpus` for details."""
+
+    __slots__ = ("corpus", "position")
+
+    def __init__(self, corpus, position):
+        self.corpus = corpus
+        self.position = position
+
+    def __getitem__(self, key):
+        if key not in self.corpus.columns:
+            if key in conllu.Token.MAPPING:
+                return self[conllu.Token.MAPPING[key]]
+            raise KeyError(key)
+        code = self.corpus.columns[key][self.position]
+        if code == ColumnarCorpus.ABSENT:
+            raise KeyError(key)
+        return self.corpus.decode(key, code)
+
+    def __setitem__(self, key, value):
+        if key not in self.corpus.columns:
+            raise KeyError(f"{key} is not a conllulex column")
+        self.corpus.columns[key][self.position] = self.corpus.intern(key, serialize_field(value))
+
+    def __delitem__(self, key):
+        raise TypeError("Columns cannot be removed from a ColumnarCorpus token")
+
+    def __iter__(self):
+        columns = self.corpus.columns
+        return (field for field in CONLLULEX_FIELDS if columns[field][self.position] != ColumnarCorpus.ABSENT)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self))
@@ -0,0 +1,246 @@
+import os
+
+import pytest
+from conllu.parser import parse_sentences
+
+from conllulex import conllulex_enrichment as enrichment
+from conllulex.config import CORPUS_CFG
+from conllulex.reading import ColumnarCorpus, iter_conllulex_file
+
+# Subtasks that look up tokens and MWEs through `sentence_index`
+INDEXED_SUBTASKS = [
+    "make_compound_prts_smwes",
+    "add_mwe_metadatum",
+    "add_lexlemma",
+    "add_wlemma",
+    "add_lexcat",
+    "add_lextag",
+    "renumber_mwes",
+]
+
+
+@pytest.fixture
+def sparse_path(data_path):
+    return data_path("sparse.conllulex")
+
+
+def test_columnar_corpus_enriches_like_token_lists(sparse_path):
+    token_lists = list(iter_conllulex_file(sparse_path))
+    corpus = ColumnarCorpus.from_file(sparse_path)
+    for subtask in INDEXED_SUBTASKS:
+        getattr(enrichment, subtask)(token_lists)
+        getattr(enrichment, subtask)(corpus)
+    assert [sentence.to_tokenlist().serialize() for sentence in corpus] == [tl.serialize() for tl in token_lists]
+
+
+def test_sentence_index_is_kept_on_columnar_sentences(sparse_path):
+    sentence = ColumnarCorpus.from_file(sparse_path)[1]
+    index = enrichment.sentence_index(sentence)
+    assert enrichment.sentence_index(sentence) is index
+    assert index.token(3)["form"] == "out"
+
+
+@pytest.fixture
+def close_pipeline_resources():
+    yield
+    enrichment._close_pipeline_resources()
+
+
+def test_parses_from_conllu_skip_multiword_tokens_and_empty_nodes(data_path, close_pipeline_resources):
+    sentences = list(iter_conllulex_file(data_path("mwt.conllulex")))
+    enrichment.run_through_pipeline(sentences, "en", parses_path=data_path("mwt.conllu"))
+    tokens = {t["id"]: t for t in sentences[0]}
+    assert (tokens[2]["lemma"], tokens[2]["head"], tokens[2]["deprel"]) == ("can", 0, "root")
+    assert (tokens[7]["lemma"], tokens[7]["head"]) == (".", 2)
+    assert tokens[(2, "-", 3)]["lemma"] == "_"
+    assert (tokens[(6, ".", 1)]["lemma"], tokens[(6, ".", 1)]["head"]) == ("go", None)
+    assert sentences[1][1]["feats"] == {"Tense": "Past", "VerbForm": "Part"}
+
+
+def test_conllu_backend_rereads_dropped_parses(data_path):
+    sentences = list(iter_conllulex_file(data_path("mwt.conllulex")))
+    backend = enrichment.ConlluBackend(data_path("mwt.conllu"), max_skipped=0)
+    try:
+        # The second sentence comes first in the file, so looking for the first one skips and drops it
+        first, second = backend.parse(sentences)
+    finally:
+        backend.close()
+    assert [word.lemma for word in first] == ["I", "can", "not", ",", "you", "can", "."]
+    assert [word.lemma for word in second] == ["highly", "recommend"]
+
+
+def test_conllu_backend_rejects_mismatched_token_ids(data_path):
+    sentence = next(iter_conllulex_file(data_path("mwt.conllulex")))
+    del sentence[-1]
+    backend = enrichment.ConlluBackend(data_path("mwt.conllu"))
+    try:
+        with pytest.raises(Exception, match="token IDs"):
+            backend.parse([sentence])
+    finally:
+        backend.close()
+
+
+def test_enrichment_cache_round_trip(data_path, tmp_path):
+    input_path = data_path("sparse.conllulex")
+    subtasks = ["add_mwe_metadatum", "add_lexlemma", "add_lexcat", "add_lextag"]
+    expected_path, first_path, second_path = (str(tmp_path / name) for name in ("expected", "first", "second"))
+    incremental_path = str(tmp_path / "enriched.sqlite")
+    enrichment.main(input_path, expected_path, subtasks)
+    enrichment.main(input_path, first_path, subtasks, incremental_path=incremental_path)
+
+    cache = enrichment.EnrichmentCache(incremental_path, subtasks)
+    try:
+        with open(input_path) as f:
+            raw_sentences = list(parse_sentences(f))
+        assert all(cache.get(cache.key(raw_sentence)) is not None for raw_sentence in raw_sentences)
+    finally:
+        cache.close()
+
+    enrichment.main(input_path, second_path, subtasks, incremental_path=incremental_path)
+    with open(expected_path) as expected, open(first_path) as first, open(second_path) as second:
+        assert expected.read() == first.read() == second.read()
+
+
+def test_enrichment_cache_key_depends_on_subtasks_and_options(data_path, tmp_path):
+    raw_sentence = "# sent_id = 1\n1\tHi\t_\t_\t_\t_\t_\t_\t_\t_\t_\t_\t_\t_\t_\t_\t_\t_\t_"
+    parses_path = tmp_path / "parses.conllu"
+    parses_path.write_text("# sent_id = 1\n1\tHi\thi\tINTJ\tUH\t_\t0\troot\t0:root\t_\n\n")
+
+    def key(subtasks, subtask_options=None):
+        cache = enrichment.EnrichmentCache(str(tmp_path / "enriched.sqlite"), subtasks, subtask_options)
+        try:
+            return cache.key(raw_sentence)
+        finally:
+            cache.close()
+
+    pipeline = [["run_through_pipeline", "en"]]
+    options = {"run_through_pipeline": {"parses_path": str(parses_path)}}
+    before = key(pipeline, options)
+    assert before == key(pipeline, options)
+    assert before != key(["add_lexlemma"])
+    parses_path.write_text("# sent_id = 1\n1\tHi\thi\tINTJ\tUH\t_\t0\troot\t0:root\tSpaceAfter=No\n\n")
+    assert before != key(pipeline, options)
+
+
+def test_enrichment_cache_gives_new_sent_ids(tmp_path):
+    sentence = "# text = Hi\n1\tHi\t_\t_\t_\t_\t_\t_\t_\t_\t_\t_\t_\t_\t_\t_\t_\t_\t_\n\n"
+    input_path = tmp_path / "input.conllulex"
+    input_path.write_text(sentence * 2)
+    incremental_path = str(tmp_path / "enriched.sqlite")
+
+    sent_ids = []
+    for run in range(2):
+        output_path = tmp_path / f"output{run}.conllulex"
+        enrichment.main(str(input_path), str(output_path), ["assign_sent_id"], incremental_path=incremental_path)
+        sent_ids += [s.metadata["sent_id"] for s in iter_conllulex_file(str(output_path))]
+    assert len(set(sent_ids)) == 4
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("jobs", [2, 3])
+def test_jobs_give_the_same_output(sparse_path, tmp_path, jobs):
+    subtasks = CORPUS_CFG["pastrie"]["enrichment_subtasks"]
+    enrichment.main(sparse_path, str(tmp_path / "expected"), subtasks)
+    enrichment.main(sparse_path, str(tmp_path / "output"), subtasks, jobs=jobs)
+    assert _read(tmp_path / "output") == _read(tmp_path / "expected")
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_fused_gives_the_same_output(sparse_path, tmp_path, monkeypatch, jobs):
+    monkeypatch.setattr(enrichment, "CHUNK_SIZE", 2)
+    subtasks = CORPUS_CFG["pastrie"]["enrichment_subtasks"]
+    enrichment.main(sparse_path, str(tmp_path / "expected"), subtasks)
+    enrichment.main(sparse_path, str(tmp_path / "output"), subtasks, jobs=jobs, fused=True)
+    assert _read(tmp_path / "output") == _read(tmp_path / "expected")
+
+
+def test_fused_reads_everything_before_overwriting_the_input(sparse_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(enrichment, "CHUNK_SIZE", 2)
+    subtasks = CORPUS_CFG["pastrie"]["enrichment_subtasks"]
+    enrichment.main(sparse_path, str(tmp_path / "expected"), subtasks)
+    in_place_path = tmp_path / "in_place"
+    in_place_path.write_text(_read(sparse_path))
+    enrichment.main(str(in_place_path), str(in_place_path), subtasks, fused=True)
+    assert _read(in_place_path) == _read(tmp_path / "expected")
+
+
+def _recording_add_wlemma(enriched, interrupt_at):
+    # add_wlemma, but recording which sentences it enriched, and interrupting the run at those in `interrupt_at`
+    def add_wlemma(sentences):
+        for sentence in sentences:
+            if sentence.metadata["sent_id"] in interrupt_at:
+                raise KeyboardInterrupt()
+            enriched.append(sentence.metadata["sent_id"])
+        enrichment.add_wlemma(sentences)
+
+    return add_wlemma
+
+
+def test_resume_after_interruption(sparse_path, tmp_path, monkeypatch):
+    subtasks = CORPUS_CFG["pastrie"]["enrichment_subtasks"]
+    expected_path, output_path = str(tmp_path / "expected"), str(tmp_path / "output")
+    enrichment.main(sparse_path, expected_path, subtasks)
+
+    enriched, interrupt_at = [], {"doc-00001-0004"}
+    monkeypatch.setattr(enrichment, "CHUNK_SIZE", 1)
+    monkeypatch.setitem(enrichment.SUBTASKS, "add_wlemma", _recording_add_wlemma(enriched, interrupt_at))
+    with pytest.raises(KeyboardInterrupt):
+        enrichment.main(sparse_path, output_path, subtasks, checkpoint_every=1)
+    assert not os.path.exists(output_path)
+    assert enriched == ["doc-00001-0001", "doc-00001-0002"]
+
+    enriched.clear()
+    interrupt_at.clear()
+    enrichment.main(sparse_path, output_path, subtasks, checkpoint_every=1, resume=True)
+    assert enriched == ["doc-00001-0004"]
+    assert _read(output_path) == _read(expected_path)
+    assert not os.path.exists(output_path + ".checkpoint")
+    assert not os.path.exists(output_path + ".partial")
+
+
+def test_resume_refuses_checkpoints_made_with_other_options(sparse_path, tmp_path, monkeypatch):
+    subtasks = CORPUS_CFG["pastrie"]["enrichment_subtasks"]
+    output_path = str(tmp_path / "output")
+    monkeypatch.setattr(enrichment, "CHUNK_SIZE", 1)
+    monkeypatch.setitem(enrichment.SUBTASKS, "add_wlemma", _recording_add_wlemma([], {"doc-00001-0004"}))
+    with pytest.raises(KeyboardInterrupt):
+        enrichment.main(sparse_path, output_path, subtasks, checkpoint_every=1)
+
+    options = {"add_wlemma": {"interrupt_at": None}}
+    with pytest.raises(Exception, match="different input file, subtasks or options"):
+        enrichment.main(sparse_path, output_path, subtasks, subtask_options=options, checkpoint_every=1, resume=True)
+
+
+def test_add_lexcat_strips_shorthand_prefix(sparse_path):
+    sentences = list(iter_conllulex_file(sparse_path))
+    token = sentences[2][4]
+    token["ss"] = "p.`d"
+    enrichment.add_lexcat(sentences)
+    assert (token["lexcat"], token["ss"]) == ("DISC", "_")
+
+
+def test_normalize_supersenses_counts_rewrites(sparse_path):
+    sentences = list(iter_conllulex_file(sparse_path))
+    rewrites = enrichment.normalize_supersenses(sentences, "dedupe_question_marks", "prefix_prepositional")
+    assert rewrites == {"prefix_prepositional": 7, "dedupe_question_marks": 1}
+    assert (sentences[1][2]["ss"], sentences[1][2]["ss2"]) == ("p.Source", "p.Source")
+    assert (sentences[2][3]["ss"], sentences[2][3]["ss2"]) == ("??", "_")
+
+
+def test_check_subtask_order():
+    assert enrichment.check_subtask_order(["add_lexcat", "add_lextag"]) == []
+    assert enrichment.check_subtask_order(["add_lextag", "add_lexcat"]) == [
+        "add_lextag reads lexcat, which is only filled in by add_lexcat after it"
+    ]
+
+
+def test_done_subtasks_skip_sentences(sparse_path):
+    sentences = list(iter_conllulex_file(sparse_path))
+    sentences[0].metadata["mwe"] = "kept"
+    enrichment._run_subtasks(sentences, ["add_mwe_metadatum"])
+    assert sentences[0].metadata["mwe"] == "kept"
+    assert sentences[1].metadata["mwe"] == "I went out_of the New~York house ."
@@ -0,0 +1,83 @@
+import json
+import os
+
+import pytest
+
+from conllulex import conllulex_to_json
+from conllulex.conllulex_to_json import _store_conllulex, convert_conllulex_to_json, read_json_sentences
+from conllulex.reading import iter_conllulex_file
+
+
+def test_store_conllulex_toks_leaves_out_empty_nodes(data_path):
+    token_list = next(iter_conllulex_file(data_path("mwt.conllulex"), keep_source=True))
+    # Columns may also be separated by two or more spaces, and the source may end in a blank line
+    token_list.source = token_list.source.replace("\t", "  ") + "\n"
+    sentence = {}
+    _store_conllulex(sentence, token_list, [], "toks")
+    ids = [line.split()[0] for line in sentence["conllulex"].split("\n")]
+    assert ids == ["1", "2-3", "2", "3", "4", "5", "6", "7"]
+
+
+def _read_sentences(path):
+    with open(path) as f:
+        output_format, sentences = read_json_sentences(f)
+        return output_format, list(sentences)
+
+
+def test_jsonl_and_json_hold_the_same_sentences(data_path, tmp_path):
+    json_path, jsonl_path = str(tmp_path / "corpus.json"), str(tmp_path / "corpus.jsonl")
+    convert_conllulex_to_json(data_path("streusle.conllulex"), json_path, "streusle")
+    convert_conllulex_to_json(data_path("streusle.conllulex"), jsonl_path, "streusle", output_format="jsonl")
+    json_format, json_sentences = _read_sentences(json_path)
+    jsonl_format, jsonl_sentences = _read_sentences(jsonl_path)
+    assert (json_format, jsonl_format) == ("json", "jsonl")
+    assert len(json_sentences) == 3
+    assert jsonl_sentences == json_sentences
+    with open(json_path) as f:
+        assert json.load(f) == json_sentences
+    with open(jsonl_path) as f:
+        assert len(f.read().splitlines()) == 3
+
+
+@pytest.mark.parametrize("output_format", ["json", "jsonl"])
+def test_jobs_give_the_same_output(data_path, tmp_path, output_format):
+    expected_path, output_path = str(tmp_path / "expected"), str(tmp_path / "output")
+    convert_conllulex_to_json(data_path("streusle.conllulex"), expected_path, "streusle", output_format=output_format)
+    convert_conllulex_to_json(
+        data_path("streusle.conllulex"), output_path, "streusle", output_format=output_format, jobs=2
+    )
+    with open(expected_path) as expected, open(output_path) as output:
+        assert output.read() == expected.read()
+
+
+def test_invalid_jsonl_output_is_not_written(data_path, tmp_path):
+    input_path, output_path = tmp_path / "corpus.conllulex", tmp_path / "corpus.jsonl"
+    with open(data_path("streusle.conllulex")) as f:
+        input_path.write_text(f.read().replace("\tO-PRON", "\tO-ADV", 1))
+    convert_conllulex_to_json(str(input_path), str(output_path), "streusle", output_format="jsonl")
+    assert sorted(os.listdir(tmp_path)) == ["corpus.conllulex"]
+
+
+def test_invalid_jsonl_on_stdout_ends_in_an_error(data_path, tmp_path, capfd):
+    input_path = tmp_path / "corpus.conllulex"
+    with open(data_path("streusle.conllulex")) as f:
+        input_path.write_text(f.read().replace("\tO-PRON", "\tO-ADV", 1))
+    with pytest.raises(SystemExit) as exit_info:
+        convert_conllulex_to_json(str(input_path), "-", "streusle", output_format="jsonl")
+    assert exit_info.value.code == 1
+    output_path = tmp_path / "corpus.jsonl"
+    output_path.write_text(capfd.readouterr().out)
+    with pytest.raises(ValueError, match="incomplete"):
+        _read_sentences(output_path)
+
+
+def test_interrupted_jsonl_output_is_not_left_behind(data_path, tmp_path, monkeypatch):
+    def interrupting_json_line(sentence):
+        raise KeyboardInterrupt()
+
+    monkeypatch.setattr(conllulex_to_json, "json_line", interrupting_json_line)
+    with pytest.raises(KeyboardInterrupt):
+        convert_conllulex_to_json(
+            data_path("streusle.conllulex"), str(tmp_path / "corpus.jsonl"), "streusle", output_format="jsonl"
+        )
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,40 @@
+import os
+import shutil
+
+import pytest
+
+from conllulex.indexing import IndexedConllulex, get_index_path
+from conllulex.reading import iter_conllulex_file
+
+
+@pytest.fixture
+def streusle_copy(data_path, tmp_path):
+    """A copy of the test corpus, so that its index is written next to it in a temporary directory."""
+    path = str(tmp_path / "streusle.conllulex")
+    shutil.copy(data_path("streusle.conllulex"), path)
+    return path
+
+
+def test_lookup_by_sent_id(streusle_copy):
+    token_lists = list(iter_conllulex_file(streusle_copy))
+    with IndexedConllulex(streusle_copy, corpus="streusle") as corpus:
+        assert len(corpus) == 3
+        assert corpus.sent_ids() == [tl.metadata["sent_id"] for tl in token_lists]
+        assert "reviews-001325-0002" in corpus
+        assert corpus["reviews-001325-0002"].serialize() == token_lists[1].serialize()
+        assert [tl.serialize() for tl in corpus.doc("reviews-001325")] == [tl.serialize() for tl in token_lists]
+        with pytest.raises(KeyError):
+            corpus["reviews-001325-0004"]
+    assert os.path.exists(get_index_path(streusle_copy))
+
+
+def test_index_is_rebuilt_after_edits(streusle_copy):
+    with IndexedConllulex(streusle_copy, corpus="streusle") as corpus:
+        assert corpus.position("reviews-001325-0003") == 2
+    with open(streusle_copy) as f:
+        blocks = f.read().strip("\n").split("\n\n")
+    with open(streusle_copy, "w") as f:
+        f.write("\n\n".join(blocks[1:]) + "\n\n")
+    with IndexedConllulex(streusle_copy, corpus="streusle") as corpus:
+        assert corpus.position("reviews-001325-0003") == 1
+        assert "reviews-001325-0001" not in corpus
@@ -0,0 +1,53 @@
+import tracemalloc
+
+from conllulex import conllulex_enrichment as enrichment
+from conllulex.conllulex_enrichment import add_lexlemma
+from conllulex.profiling import SubtaskProfile
+from conllulex.reading import LazyToken, iter_conllulex_file
+
+
+def test_subtask_profile_run(data_path):
+    sentences = list(iter_conllulex_file(data_path("sparse.conllulex")))
+    profile = SubtaskProfile(["add_lexlemma"])
+    profile.run("add_lexlemma", add_lexlemma, sentences, (), {})
+    assert not tracemalloc.is_tracing()
+    stats = profile.stats["add_lexlemma"]
+    assert stats["sentences"] == 3
+    assert stats["tokens"] == 16
+    assert stats["cells_changed"] > 0
+
+
+def test_subtask_profile_leaves_tracing_it_did_not_start(data_path):
+    sentences = list(iter_conllulex_file(data_path("sparse.conllulex")))
+    tracemalloc.start()
+    try:
+        SubtaskProfile().run("add_lexlemma", add_lexlemma, sentences, (), {})
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+
+def test_counting_changed_cells_keeps_tokens_lazy(data_path):
+    sentences = list(iter_conllulex_file(data_path("streusle.conllulex")))
+    lazy = [t for s in sentences for t in s if isinstance(t, LazyToken) and t._raw is not None]
+    assert lazy
+    profile = SubtaskProfile()
+    profile.run("noop", lambda sentences: None, sentences, (), {})
+    assert profile.stats["noop"]["cells_changed"] == 0
+    assert all(t._raw is not None for t in lazy)
+
+
+def test_profiled_run_makes_one_call_per_subtask(data_path, tmp_path, monkeypatch):
+    calls = []
+    run = SubtaskProfile.run
+
+    def counting_run(self, subtask, function, sentences, args, kwargs):
+        calls.append((subtask, len(sentences)))
+        return run(self, subtask, function, sentences, args, kwargs)
+
+    monkeypatch.setattr(SubtaskProfile, "run", counting_run)
+    subtasks = ["add_lexlemma", "add_wlemma"]
+    profile = SubtaskProfile(subtasks)
+    enrichment.main(data_path("sparse.conllulex"), str(tmp_path / "output"), subtasks, fused=True, profile=profile)
+    assert calls == [("add_lexlemma", 3), ("add_wlemma", 3)]
+    assert profile.stats["add_lexlemma"]["peak_memory_delta"] > 0
@@ -0,0 +1,189 @@
+import io
+import os
+import pickle
+import shutil
+import stat
+import time
+
+import conllu
+import pytest
+
+from conllulex.reading import (
+    CONLLULEX_FIELDS,
+    ColumnarCorpus,
+    get_conllulex_tokenlists,
+    is_compressed,
+    iter_conllulex_file,
+    iter_conllulex_tokenlists,
+    open_file,
+    serialize_conllulex_sentence,
+)
+
+
+def test_iter_conllulex_tokenlists(data_path):
+    with open(data_path("streusle.conllulex")) as f:
+        expected = conllu.parse(f.read(), fields=CONLLULEX_FIELDS)
+    with open(data_path("streusle.conllulex")) as f:
+        token_lists = list(iter_conllulex_tokenlists(f))
+    assert [tl.serialize() for tl in token_lists] == [tl.serialize() for tl in expected]
+
+
+def test_iter_conllulex_tokenlists_is_lazy(data_path):
+    with open(data_path("streusle.conllulex")) as f:
+        text = f.read()
+    read = []
+
+    def lines():
+        for line in io.StringIO(text):
+            read.append(line)
+            yield line
+
+    first = next(iter_conllulex_tokenlists(lines()))
+    assert first.metadata["sent_id"] == "reviews-001325-0001"
+    assert len(read) < len(text.splitlines())
+
+
+def _cache_files(cache_dir):
+    return sorted(os.listdir(cache_dir))
+
+
+def test_parse_cache_round_trip(data_path, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    expected = [token_list.serialize() for token_list in iter_conllulex_file(data_path("sparse.conllulex"))]
+    first = get_conllulex_tokenlists(data_path("sparse.conllulex"), cache_dir=cache_dir)
+    (entry,) = _cache_files(cache_dir)
+    second = get_conllulex_tokenlists(data_path("sparse.conllulex"), cache_dir=cache_dir)
+    assert _cache_files(cache_dir) == [entry]
+    assert [tl.serialize() for tl in first] == [tl.serialize() for tl in second] == expected
+
+
+def test_parse_cache_is_invalidated_by_edits(data_path, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    conllulex_path = str(tmp_path / "input.conllulex")
+    shutil.copy(data_path("sparse.conllulex"), conllulex_path)
+    get_conllulex_tokenlists(conllulex_path, cache_dir=cache_dir)
+    with open(conllulex_path) as f:
+        text = f.read()
+    with open(conllulex_path, "w") as f:
+        f.write(text.replace("Highly", "Very"))
+    token_lists = get_conllulex_tokenlists(conllulex_path, cache_dir=cache_dir)
+    assert token_lists[0][0]["form"] == "Very"
+    assert len(_cache_files(cache_dir)) == 2
+
+
+def test_parse_cache_entries_follow_umask(data_path, tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    umask = os.umask(0o022)
+    try:
+        get_conllulex_tokenlists(data_path("sparse.conllulex"), cache_dir=cache_dir)
+    finally:
+        os.umask(umask)
+    (entry,) = _cache_files(cache_dir)
+    assert stat.S_IMODE(os.stat(os.path.join(cache_dir, entry)).st_mode) == 0o644
+
+
+def test_parse_cache_eviction_removes_stale_temporary_files(data_path, tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    stale, fresh = cache_dir / "stale.tmp", cache_dir / "fresh.tmp"
+    stale.write_bytes(b"")
+    fresh.write_bytes(b"")
+    two_hours_ago = time.time() - 2 * 3600
+    os.utime(stale, (two_hours_ago, two_hours_ago))
+    get_conllulex_tokenlists(data_path("sparse.conllulex"), cache_dir=str(cache_dir))
+    files = _cache_files(cache_dir)
+    assert "stale.tmp" not in files
+    assert "fresh.tmp" in files
+
+
+def test_parser_matches_conllu(data_path):
+    for name in ("sparse.conllulex", "streusle.conllulex", "mwt.conllulex"):
+        with open(data_path(name)) as f:
+            expected = conllu.parse(f.read(), fields=CONLLULEX_FIELDS)
+        token_lists = list(iter_conllulex_file(data_path(name)))
+        assert [tl.metadata for tl in token_lists] == [tl.metadata for tl in expected]
+        assert [[dict(t) for t in tl] for tl in token_lists] == [[dict(t) for t in tl] for tl in expected]
+        assert [tl.serialize() for tl in token_lists] == [tl.serialize() for tl in expected]
+
+
+def test_columnar_corpus_round_trip(data_path):
+    token_lists = list(iter_conllulex_file(data_path("streusle.conllulex")))
+    corpus = ColumnarCorpus.from_tokenlists(token_lists)
+    assert len(corpus) == len(token_lists)
+    assert [len(sentence) for sentence in corpus] == [len(tl) for tl in token_lists]
+    assert [tl.serialize() for tl in corpus.to_tokenlists()] == [tl.serialize() for tl in token_lists]
+    corpus = pickle.loads(pickle.dumps(corpus))
+    assert [tl.serialize() for tl in corpus.to_tokenlists()] == [tl.serialize() for tl in token_lists]
+
+
+def test_columnar_corpus_writes(data_path):
+    corpus = ColumnarCorpus.from_file(data_path("sparse.conllulex"))
+    token = corpus[1][2]
+    token["lexcat"] = "P"
+    token["head"] = 7
+    assert (token["lexcat"], token["head"]) == ("P", 7)
+    assert corpus[1].to_tokenlist()[2]["head"] == 7
+
+
+@pytest.mark.parametrize("suffix", [".gz", ".xz", ".bz2"])
+def test_compressed_files(data_path, tmp_path, suffix):
+    path = str(tmp_path / ("corpus.conllulex" + suffix))
+    with open(data_path("streusle.conllulex")) as src, open_file(path, "w") as dst:
+        dst.write(src.read())
+    assert is_compressed(path)
+    expected = [tl.serialize() for tl in iter_conllulex_file(data_path("streusle.conllulex"))]
+    assert [tl.serialize() for tl in iter_conllulex_file(path)] == expected
+
+
+def test_serializer_round_trips(data_path):
+    with open(data_path("streusle.conllulex")) as f:
+        text = f.read()
+    with open(data_path("streusle.conllulex")) as f:
+        serialized = "".join(serialize_conllulex_sentence(tl) for tl in iter_conllulex_tokenlists(f))
+    assert serialized == text
+
+
+def test_keep_source(data_path):
+    with open(data_path("streusle.conllulex")) as f:
+        blocks = f.read().strip("\n").split("\n\n")
+    token_lists = iter_conllulex_file(data_path("streusle.conllulex"), keep_source=True)
+    assert [tl.source for tl in token_lists] == blocks
+
+
+def test_columnar_corpus_dump_round_trip(data_path):
+    corpus = ColumnarCorpus.from_file(data_path("streusle.conllulex"))
+    f = io.BytesIO()
+    corpus.dump(f)
+    f.seek(0)
+    loaded = ColumnarCorpus.load(f)
+    assert [tl.serialize() for tl in loaded.to_tokenlists()] == [tl.serialize() for tl in corpus.to_tokenlists()]
+    assert [s.metadata for s in loaded] == [s.metadata for s in corpus]
+
+
+def test_columnar_corpus_load_rejects_bad_dumps(data_path):
+    f = io.BytesIO()
+    ColumnarCorpus.from_file(data_path("streusle.conllulex")).dump(f)
+    dump = f.getvalue()
+    for bad in (b"", pickle.dumps([1]), dump[:-1], dump.replace(b'"n_tokens": 20', b'"n_tokens": 21')):
+        with pytest.raises((EOFError, ValueError)):
+            ColumnarCorpus.load(io.BytesIO(bad))
+
+
+def test_parse_cache_does_not_unpickle_entries(data_path, tmp_path):
+    cache_dir = tmp_path / "cache"
+    get_conllulex_tokenlists(data_path("sparse.conllulex"), cache_dir=str(cache_dir))
+    (entry,) = cache_dir.iterdir()
+    # Unpickling this would raise instead of returning an entry
+    entry.write_bytes(pickle.dumps(_Unpicklable()))
+    token_lists = get_conllulex_tokenlists(data_path("sparse.conllulex"), cache_dir=str(cache_dir))
+    assert len(token_lists) == 3
+    assert entry.read_bytes().startswith(b"conllulex-columns")
+
+
+class _Unpicklable:
+    def __reduce__(self):
+        return (_fail, ())
+
+
+def _fail():
+    raise AssertionError("the cache entry was unpickled")